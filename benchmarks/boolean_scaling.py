@@ -0,0 +1,86 @@
+'''
+Scaling benchmark for parallel booleans: generates the 500 hole rectangular tube of the
+corpus with the direct engine, every tool cut from the stock in one boolean, at 1, 2, 4 and
+8 threads, each in a fresh FreeCADCmd process. Prints the generation time, the time of the
+boolean itself and the boolean's speedup over one thread.
+
+Run with python benchmarks/boolean_scaling.py, --threads sets the thread counts, --piece
+another corpus piece and --repeat how many runs the best time is taken from, --output also
+writes the times and the machine they were measured on to a json file. TUBEGEN_PARALLEL
+limits threads through processor affinity, so the benchmark refuses to run on platforms
+without it, such as Windows and macOS.
+'''
+
+import argparse, json, os, subprocess, sys, tempfile
+
+from run_benchmarks import machine_info
+
+benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+tubegen_path = os.path.join(os.path.dirname(benchmark_dir), 'tubegen.py')
+
+# generate a piece at a thread count in its own FreeCAD process, returning its timing report, None if it failed
+def run_piece(freecad_cmd, csv_file, threads, work_dir):
+
+	stl_file = os.path.join(work_dir, 'scaling_{}.stl'.format(threads))
+
+	env = dict(os.environ, TUBEGEN_CSV=csv_file, TUBEGEN_STL=stl_file, TUBEGEN_TIMING='1', TUBEGEN_ENGINE='direct', TUBEGEN_CUT='single', TUBEGEN_PARALLEL=str(threads))
+	for name in ('TUBEGEN_CACHE', 'TUBEGEN_JOB', 'TUBEGEN_WORKERS', 'TUBEGEN_SERVE'):  # one piece, always generated
+		env.pop(name, None)
+
+	subprocess.run([freecad_cmd, tubegen_path], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+	try:
+		with open(os.path.splitext(stl_file)[0] + '.timing.json') as timing:
+			return json.load(timing)
+	except OSError:
+		return None
+
+def main():
+
+	parser = argparse.ArgumentParser(description='Time parallel booleans at several thread counts.')
+	parser.add_argument('--piece', default='rect_holes_500', help='corpus piece to generate, default rect_holes_500')
+	parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8], help='thread counts, default 1 2 4 8')
+	parser.add_argument('--repeat', type=int, default=3, help='runs per thread count, the fastest is kept, default 3')
+	parser.add_argument('--freecad-cmd', default=os.environ.get('TUBEGEN_FREECADCMD', 'FreeCADCmd'))
+	parser.add_argument('--output', help='also write the times to this json file')
+	args = parser.parse_args()
+
+	# without processor affinity every run would use every processor, and the timings would compare nothing
+	if not hasattr(os, 'sched_setaffinity'):
+		print('TUBEGEN_PARALLEL has no effect on this platform, the thread counts cannot be compared')
+		return 1
+
+	processors = len(os.sched_getaffinity(0))
+	if max(args.threads) > processors:
+		print('Only {} processors are available, runs with more threads use {}'.format(processors, processors))
+
+	csv_file = os.path.join(benchmark_dir, 'corpus', args.piece + '.csv')
+
+	print('{:>7} {:>9} {:>9} {:>8}'.format('threads', 'seconds', 'boolean', 'speedup'))
+	single_thread = None
+	runs = []
+	for threads in args.threads:
+		best = None
+		with tempfile.TemporaryDirectory() as work_dir:
+			for run in range(args.repeat):
+				report = run_piece(args.freecad_cmd, csv_file, threads, work_dir)
+				if report is None:
+					print('{:>7} failed, see FreeCADCmd output with TUBEGEN_CSV={} TUBEGEN_PARALLEL={}'.format(threads, csv_file, threads))
+					return 1
+				boolean = report['stages'].get('boolean_cut', {}).get('seconds', 0.0)
+				if best is None or boolean < best[1]:
+					best = (report['seconds'], boolean)
+
+		seconds, boolean = best
+		single_thread = single_thread or boolean
+		print('{:>7} {:>9.3f} {:>9.3f} {:>7.2f}x'.format(threads, seconds, boolean, single_thread / boolean if boolean else 0))
+		runs.append({'threads': threads, 'seconds': seconds, 'boolean_seconds': boolean, 'speedup': single_thread / boolean if boolean else None})
+
+	if args.output:
+		with open(args.output, 'w') as output_file:
+			json.dump({'recorded_on': machine_info(args.freecad_cmd), 'piece': args.piece, 'processors': processors, 'runs': runs}, output_file, indent=1)
+
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,80 @@
+'''
+Checks that the modeling settings build the same solid: runs TUBEGEN_COMPARE (PartDesign
+against the direct engine) and TUBEGEN_COMPARE_CUT (the direct engine cutting each pocket
+against one boolean) on every corpus piece, each in a fresh FreeCADCmd process, with and
+without merged features. Prints each piece's volume and the volume by which the two builds
+differ, and exits with status 1 if any difference is over --tolerance of the piece's volume.
+
+Run with python benchmarks/compare_corpus.py, --compare picks the comparisons, pieces can be
+named to run only those, and --output also writes the results as json.
+'''
+
+import argparse, json, os, re, subprocess, sys, tempfile
+
+benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+tubegen_path = os.path.join(os.path.dirname(benchmark_dir), 'tubegen.py')
+
+# environment variable running each comparison
+comparisons = {'engines': 'TUBEGEN_COMPARE', 'cut': 'TUBEGEN_COMPARE_CUT', 'recompute': 'TUBEGEN_COMPARE_RECOMPUTE'}
+
+# compare one piece in its own FreeCAD process, returning the first build's volume and the difference, None if it failed
+def compare_piece(freecad_cmd, csv_file, comparison, merge):
+
+	with tempfile.TemporaryDirectory() as work_dir:
+		env = dict(os.environ, TUBEGEN_SECTIONS=work_dir)  # catalog sections are sketched every run
+		env[comparisons[comparison]] = csv_file
+		for name in ('TUBEGEN_CACHE', 'TUBEGEN_JOB', 'TUBEGEN_WORKERS', 'TUBEGEN_SERVE', 'TUBEGEN_CSV', 'TUBEGEN_MERGE', *comparisons.values()):
+			if name != comparisons[comparison]:
+				env.pop(name, None)
+		if merge:
+			env['TUBEGEN_MERGE'] = '1'
+
+		output = subprocess.run([freecad_cmd, tubegen_path], env=env, capture_output=True, text=True).stdout
+
+	volumes = re.findall(r'^Compare: \S+ [\d.]+ s, volume ([\d.]+)', output, re.MULTILINE)
+	difference = re.findall(r'^Compare: difference volume ([\d.]+)', output, re.MULTILINE)
+	if not volumes or not difference:
+		return None
+
+	return float(volumes[0]), float(difference[0])
+
+def main():
+
+	parser = argparse.ArgumentParser(description='Compare the solids built with different modeling settings over the corpus.')
+	parser.add_argument('pieces', nargs='*', help='corpus piece names to run, default all')
+	parser.add_argument('--compare', nargs='+', choices=sorted(comparisons), default=['engines', 'cut'], help='comparisons to run, default engines and cut')
+	parser.add_argument('--tolerance', type=float, default=1e-6, help='allowed difference as a fraction of the piece volume, default 1e-6')
+	parser.add_argument('--freecad-cmd', default=os.environ.get('TUBEGEN_FREECADCMD', 'FreeCADCmd'))
+	parser.add_argument('--output', help='also write the results to this json file')
+	args = parser.parse_args()
+
+	corpus_dir = os.path.join(benchmark_dir, 'corpus')
+	names = args.pieces or sorted(os.path.splitext(name)[0] for name in os.listdir(corpus_dir) if name.endswith('.csv'))
+
+	results = []
+	failed = False
+
+	print('{:<24} {:<10} {:<6} {:>14} {:>14}  {}'.format('piece', 'compare', 'merged', 'volume', 'difference', 'status'))
+	for name in names:
+		for comparison in args.compare:
+			for merge in (False, True):
+				compared = compare_piece(args.freecad_cmd, os.path.join(corpus_dir, name + '.csv'), comparison, merge)
+				if compared is None:
+					volume = difference = None
+					status = 'failed'
+				else:
+					volume, difference = compared
+					status = 'ok' if difference <= volume * args.tolerance else 'differs'
+				failed = failed or status != 'ok'
+
+				results.append({'piece': name, 'compare': comparison, 'merged': merge, 'volume': volume, 'difference': difference, 'status': status})
+				print('{:<24} {:<10} {:<6} {:>14} {:>14}  {}'.format(name, comparison, 'yes' if merge else 'no', str(volume), str(difference), status), flush=True)
+
+	if args.output:
+		with open(args.output, 'w') as output_file:
+			json.dump(results, output_file, indent=1)
+
+	return 1 if failed else 0
+
+if __name__ == '__main__':
+	sys.exit(main())
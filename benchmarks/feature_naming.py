@@ -0,0 +1,82 @@
+'''
+Micro-benchmark of the Python overhead of building circle features, comparing the
+old exec() statements that looked every object up by name with the object handles
+the feature functions now hold. Only object creation and property setting is timed,
+the document is never recomputed.
+
+Run with FreeCADCmd benchmarks/feature_naming.py, TUBEGEN_BENCH_HOLES sets the number
+of holes (default 500).
+'''
+
+import FreeCAD, PartDesign, Sketcher, Part
+import os, time
+
+App = FreeCAD
+
+holes = int(os.environ.get('TUBEGEN_BENCH_HOLES', 500))
+
+# create a document with a body to add features to
+def new_document(name):
+
+	App.newDocument(name)
+	App.activeDocument().addObject('PartDesign::Body','Body')
+
+# one sketch and pocket per hole, named and set through exec the way the feature functions used to
+def exec_features():
+
+	for hole in range(holes):
+		sc = str(hole)
+		radius = 5
+
+		exec('App.activeDocument().Body.newObject("Sketcher::SketchObject","CircleFeatureSketch" + sc)')
+		exec('App.activeDocument().CircleFeatureSketch' + sc + '.Support = (App.activeDocument().YZ_Plane, [''])')
+		exec('App.activeDocument().CircleFeatureSketch' + sc + '.MapMode = "FlatFace"')
+		exec('App.ActiveDocument.CircleFeatureSketch' + sc + '.addGeometry(Part.Circle(App.Vector(' + str(-hole * 20) + ',0,0),App.Vector(0,0,1),radius),False)')
+
+		exec('App.activeDocument().Body.newObject("PartDesign::Pocket","CircleFeaturePocket" + sc)')
+		exec('App.activeDocument().CircleFeaturePocket' + sc + '.Profile = App.activeDocument().CircleFeatureSketch' + sc)
+		exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Length = 1000.00000')
+		exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Length2 = 1000.0000')
+		exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Type = 1')
+		exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Reversed = 1')
+
+# the same sketches and pockets, set through the objects newObject returns
+def handle_features():
+
+	body = App.activeDocument().Body
+	plane = App.activeDocument().YZ_Plane
+
+	for hole in range(holes):
+		sc = str(hole)
+		radius = 5
+
+		sketch = body.newObject('Sketcher::SketchObject', 'CircleFeatureSketch' + sc)
+		sketch.Support = (plane, [''])
+		sketch.MapMode = 'FlatFace'
+		sketch.addGeometry(Part.Circle(App.Vector(-hole * 20,0,0),App.Vector(0,0,1),radius),False)
+
+		feature = body.newObject('PartDesign::Pocket', 'CircleFeaturePocket' + sc)
+		feature.Profile = sketch
+		feature.Length = 1000
+		feature.Length2 = 1000
+		feature.Type = 1
+		feature.Reversed = True
+
+# time building the features in a fresh document
+def time_features(name, build):
+
+	new_document(name)
+
+	start = time.perf_counter()
+	build()
+	seconds = time.perf_counter() - start
+
+	App.closeDocument(App.ActiveDocument.Name)
+
+	print('{}: {} holes {:.3f} s, {:.1f} us per feature'.format(name, holes, seconds, seconds / holes * 1000000))
+
+	return seconds
+
+exec_seconds = time_features('Exec', exec_features)
+handle_seconds = time_features('Handles', handle_features)
+print('Speedup: {:.2f}x'.format(exec_seconds / handle_seconds))
@@ -0,0 +1,72 @@
+'''
+Writes the benchmark corpus, synthetic STLFile.csv pieces covering every material type,
+flat, angled and coped ends, end cut sides, and feature arrays from none to several
+hundred holes. Dimensions are in inches, as PieceMaker writes them.
+
+Run with python benchmarks/make_corpus.py, the csvs are written to benchmarks/corpus.
+'''
+
+import csv, os
+
+corpus_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# header data the feature rows are written under
+feature_headers = ['DescType', 'XDistance', 'ROS', 'Diameter', 'Seperation', 'XDistance_Y', 'ArrayIncrement', 'ArrayInstances', 'Orientation_0', 'Orientation_90', 'Orientation_180', 'Orientation_270', 'ArrayIncrement_Y', 'ArrayInstances_Y', 'ArrayIncrement_A', 'ArrayInstances_A']
+
+# parameter row columns, by the index PieceMaker writes them at
+parameter_columns = {'material_type': 2, 'diameter': 5, 'wall': 6, 'roffset': 7, 'length': 8, 'e1join': 9, 'e1angle': 10, 'e2join': 12, 'e2angle': 13, 'e1flat': 27, 'e2flat': 28, 'side1': 43, 'side2': 44, 'cradius': 45, 'e1cutside': 46, 'e2cutside': 47}
+
+# piece parameters, anything not given is a plain 48 inch piece with square ends
+def piece(**parameters):
+
+	row = ['0'] * 48
+	values = dict(length=48, e1angle=90, e2angle=90, e1flat='True', e2flat='True', e1cutside=1, e2cutside=1)
+	values.update(parameters)
+	for name, value in values.items():
+		row[parameter_columns[name]] = str(value)
+
+	return row
+
+# feature row, desc_type 0 is a circle, 1 a slot and 4 a rectangle, orientations are the 0, 90, 180 and 270 faces, angles in degrees about the tube
+def feature(desc_type, xdist, diameter, instances=1, increment=0, orientations=(1, 0, 0, 0), sep=0, ydist=0, rows=1, row_increment=0, angles=1, angle_increment=0):
+
+	values = [desc_type, xdist, 0, diameter, sep, ydist, increment, instances] + list(orientations) + [row_increment, rows, angle_increment, angles]
+
+	return [str(value) for value in values]
+
+# corpus pieces by name
+pieces = {
+	'round_plain': (piece(material_type=1, diameter=2, wall=0.12), []),
+	'round_angled': (piece(material_type=1, diameter=2, wall=0.12, e1angle=45, e2angle=60), []),
+	'round_angled_roffset': (piece(material_type=1, diameter=2, wall=0.12, e1angle=60, e2angle=45, roffset=90), []),
+	'round_coped': (piece(material_type=1, diameter=2, wall=0.12, e1flat='False', e2flat='False', e1join=2, e2join=3), []),
+	'round_holes_10': (piece(material_type=1, diameter=2, wall=0.12), [feature(0, 2, 0.5, 10, 4)]),
+	'round_holes_200': (piece(material_type=1, diameter=2, wall=0.12, length=96), [feature(0, 1, 0.25, 100, 0.9, (1, 0, 1, 0))]),
+	'round_holes_500': (piece(material_type=1, diameter=3, wall=0.12, length=120), [feature(0, 1, 0.25, 250, 0.45, (1, 1, 0, 0))]),
+	'round_polar_ring': (piece(material_type=1, diameter=3, wall=0.12), [feature(0, 2, 0.375, 4, 8, angles=6, angle_increment=60)]),
+	'round_polar_reversed': (piece(material_type=1, diameter=3, wall=0.12), [feature(0, 2, 0.375, 4, 8, angles=4, angle_increment=-45)]),
+	'round_polar_wrap': (piece(material_type=1, diameter=3, wall=0.12), [feature(0, 2, 0.375, angles=5, angle_increment=100)]),
+	'round_polar_overlap': (piece(material_type=1, diameter=3, wall=0.12), [feature(0, 2, 0.375, angles=6, angle_increment=450)]),
+	'rect_plain': (piece(material_type=2, side1=2, side2=3, wall=0.12, cradius=0.19), []),
+	'rect_angled': (piece(material_type=2, side1=2, side2=3, wall=0.12, cradius=0.19, e1angle=45, e2angle=45), []),
+	'rect_cutside_roffset': (piece(material_type=2, side1=2, side2=3, wall=0.12, cradius=0.19, e1angle=45, e2angle=60, e1cutside=2, e2cutside=2, roffset=90), []),
+	'rect_slots_20': (piece(material_type=2, side1=2, side2=3, wall=0.12, cradius=0.19), [feature(1, 2, 0.375, 20, 2, (0, 1, 0, 0), sep=0.75)]),
+	'rect_holes_400': (piece(material_type=2, side1=3, side2=3, wall=0.12, cradius=0.19, length=96), [feature(0, 1, 0.25, 100, 0.9, (1, 1, 0, 0), ydist=-0.5, rows=2, row_increment=1)]),
+	'rect_holes_500': (piece(material_type=2, side1=3, side2=3, wall=0.12, cradius=0.19, length=96), [feature(0, 1, 0.25, 125, 0.75, (1, 1, 0, 0), ydist=-0.5, rows=2, row_increment=1)]),
+	'angle_plain': (piece(material_type=3, side1=2, side2=2, wall=0.25), []),
+	'angle_angled_rects': (piece(material_type=3, side1=2, side2=2, wall=0.25, e1angle=45, e2angle=45), [feature(4, 2, 0.5, 10, 4, (1, 0, 0, 0), sep=0.5)]),
+	'flat_bar_holes_20': (piece(material_type=4, side1=2, side2=0.25, wall=0.25, e1angle=60), [feature(0, 2, 0.375, 20, 2)]),
+	'c_channel_holes_50': (piece(material_type=5, side1=3, side2=1.5, wall=0.2, e1angle=45, e2angle=45, e1cutside=2), [feature(0, 1, 0.25, 50, 0.9)]),
+	'i_beam_plain': (piece(material_type=6, side1=4, side2=4, wall=0.3), []),
+	'i_beam_holes_20': (piece(material_type=6, side1=4, side2=4, wall=0.3, e1angle=45), [feature(0, 2, 0.5, 20, 2, (1, 0, 0, 0))]),
+}
+
+os.makedirs(corpus_dir, exist_ok=True)
+
+for name, (parameters, features) in pieces.items():
+	with open(os.path.join(corpus_dir, name + '.csv'), 'w', newline='') as csvfile:
+		csv_writer = csv.writer(csvfile)
+		csv_writer.writerow(['TubeGen benchmark', name])
+		csv_writer.writerow(parameters)
+		csv_writer.writerow(feature_headers)
+		csv_writer.writerows(features)
@@ -0,0 +1,220 @@
+'''
+Runs the benchmark corpus headless, one FreeCADCmd process per piece, and records each
+piece's generation time, time to its first STL byte, peak RSS and triangle count. Results
+are compared against benchmarks/baseline.json so a piece that got slower, used more memory
+or changed its mesh is reported, and the exit status is 1 if anything regressed.
+
+Run with python benchmarks/run_benchmarks.py, --update records the results as the new
+baseline, with the machine and FreeCAD version they were recorded on. --before <git revision>
+also runs every piece with that revision's tubegen.py and prints each piece's before/after
+time side by side. --output writes the results, and the before results, to a json file to
+keep with a change. Peak RSS comes from os.wait4, or psutil where that is missing (Windows),
+and is left empty without either.
+'''
+
+import argparse, csv, json, os, platform, subprocess, sys, tempfile, time
+
+benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+tubegen_path = os.path.join(os.path.dirname(benchmark_dir), 'tubegen.py')
+baseline_path = os.path.join(benchmark_dir, 'baseline.json')
+
+# run one piece in its own FreeCAD process with a tubegen script, returning its result
+def run_piece(freecad_cmd, csv_file, work_dir, script=tubegen_path):
+
+	name = os.path.splitext(os.path.basename(csv_file))[0]
+	stl_file = os.path.join(work_dir, name + '.stl')
+
+	# a one piece batch job, so the run gets the batch report and per-stage timing
+	manifest = os.path.join(work_dir, name + '.job')
+	with open(manifest, 'w', newline='') as job:
+		csv.writer(job).writerow([csv_file, stl_file])
+
+	env = dict(os.environ, TUBEGEN_JOB=manifest, TUBEGEN_TIMING='1', TUBEGEN_SECTIONS=work_dir)  # catalog sections are sketched every run
+	env.pop('TUBEGEN_CACHE', None)  # every piece is generated, never fetched
+	env.pop('TUBEGEN_WORKERS', None)
+
+	start = time.perf_counter()
+	process = subprocess.Popen([freecad_cmd, script], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+	if hasattr(os, 'wait4'):
+		_, wait_status, usage = os.wait4(process.pid, 0)
+		process.returncode = os.waitstatus_to_exitcode(wait_status)
+		rss_kb = usage.ru_maxrss
+	else:
+		rss_kb = peak_rss_kb(process)
+	wall_seconds = time.perf_counter() - start
+
+	# the batch report holds the piece's status, unless FreeCAD itself failed
+	report_path = os.path.join(work_dir, 'batch_timing.csv')
+	if os.path.exists(report_path):
+		with open(report_path, newline='') as report:
+			status = list(csv.DictReader(report))[0]['status']
+	else:
+		status = 'error: FreeCAD exited with {}'.format(process.returncode)
+
+	result = {'status': status, 'wall_seconds': round(wall_seconds, 3), 'seconds': None, 'first_byte_seconds': None, 'rss_mb': round(rss_kb / 1024, 1) if rss_kb else None, 'triangles': None}
+
+	if status == 'ok':
+		with open(os.path.splitext(stl_file)[0] + '.timing.json') as timing:
+			report = json.load(timing)
+		result['seconds'] = report['seconds']
+		result['first_byte_seconds'] = report.get('first_byte_seconds')
+		with open(stl_file, 'rb') as stl:
+			stl.seek(80)
+			result['triangles'] = int.from_bytes(stl.read(4), 'little')
+
+	return result
+
+# wait for a process, returning its peak resident memory in kb from psutil, or None without it
+def peak_rss_kb(process):
+
+	try:
+		import psutil
+		watched = psutil.Process(process.pid)
+	except (ImportError, OSError):
+		process.wait()
+		return None
+
+	# Windows keeps the peak working set, elsewhere the peak is sampled until the process exits
+	peak = 0
+	while process.poll() is None:
+		try:
+			memory = watched.memory_info()
+		except psutil.Error:
+			break
+		peak = max(peak, getattr(memory, 'peak_wset', 0), memory.rss)
+		time.sleep(0.05)
+
+	process.wait()
+	return peak // 1024 or None
+
+# the machine and FreeCAD version results are recorded on
+def machine_info(freecad_cmd):
+
+	with tempfile.TemporaryDirectory() as work_dir:
+		script = os.path.join(work_dir, 'version.py')
+		with open(script, 'w') as version_script:
+			version_script.write("import FreeCAD\nprint('FreeCAD version:', '.'.join(FreeCAD.Version()[:3]))\n")
+		try:
+			output = subprocess.run([freecad_cmd, script], capture_output=True, text=True, timeout=120).stdout
+		except (OSError, subprocess.SubprocessError):
+			output = ''
+
+	versions = [line.split(':', 1)[1].strip() for line in output.splitlines() if line.startswith('FreeCAD version:')]
+
+	return {'freecad': versions[0] if versions else None, 'platform': platform.platform(), 'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count(), 'python': platform.python_version()}
+
+# write the tubegen script and stock catalog of a git revision into folder, returning the script's path
+def revision_script(revision, folder):
+
+	repo_dir = os.path.dirname(tubegen_path)
+	for name in ('tubegen.py', 'stock_catalog.csv'):
+		try:
+			content = subprocess.run(['git', 'show', '{}:{}'.format(revision, name)], cwd=repo_dir, capture_output=True, check=True).stdout
+		except subprocess.CalledProcessError:
+			if name == 'tubegen.py':
+				raise SystemExit('tubegen.py is not in revision ' + revision)
+			continue  # revisions before the stock catalog
+		with open(os.path.join(folder, name), 'wb') as revision_file:
+			revision_file.write(content)
+
+	return os.path.join(folder, 'tubegen.py')
+
+# problems with a result compared to its baseline
+def regressions(result, baseline, threshold):
+
+	problems = []
+
+	if result['status'] != 'ok':
+		problems.append(result['status'])
+		return problems
+
+	for measure in ('seconds', 'rss_mb'):
+		if result[measure] and baseline.get(measure) and result[measure] > baseline[measure] * (1 + threshold):
+			problems.append('{} {} -> {}'.format(measure, baseline[measure], result[measure]))
+
+	if baseline.get('triangles') and result['triangles'] != baseline['triangles']:
+		problems.append('triangles {} -> {}'.format(baseline['triangles'], result['triangles']))
+
+	return problems
+
+def main():
+
+	parser = argparse.ArgumentParser(description='Run the TubeGen benchmark corpus.')
+	parser.add_argument('pieces', nargs='*', help='corpus piece names to run, default all')
+	parser.add_argument('--freecad-cmd', default=os.environ.get('TUBEGEN_FREECADCMD', 'FreeCADCmd'))
+	parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown or memory growth over the baseline, default 0.25')
+	parser.add_argument('--update', action='store_true', help='record the results as the new baseline')
+	parser.add_argument('--before', metavar='REVISION', help='also run each piece with the tubegen.py of this git revision, for before/after times')
+	parser.add_argument('--output', help='also write the results, and the before results, to this json file')
+	args = parser.parse_args()
+
+	before_dir = tempfile.TemporaryDirectory() if args.before else None
+	before_script = revision_script(args.before, before_dir.name) if args.before else None
+
+	corpus_dir = os.path.join(benchmark_dir, 'corpus')
+	names = args.pieces or sorted(os.path.splitext(name)[0] for name in os.listdir(corpus_dir) if name.endswith('.csv'))
+
+	# the baseline holds each piece's results and the machine they were recorded on
+	baseline = {}
+	recorded_on = None
+	if os.path.exists(baseline_path):
+		with open(baseline_path) as baseline_file:
+			recorded = json.load(baseline_file)
+		baseline = recorded['pieces']
+		recorded_on = recorded['recorded_on']
+	elif not args.update:
+		print('No baseline yet, record one with --update')
+
+	machine = machine_info(args.freecad_cmd)
+	print('Machine: FreeCAD {freecad}, {platform}, {processor}, {cpus} cpus'.format(**machine))
+	if recorded_on and any(recorded_on.get(key) != machine[key] for key in ('freecad', 'platform', 'processor', 'cpus')):
+		print('Baseline recorded on another machine: FreeCAD {freecad}, {platform}, {processor}, {cpus} cpus'.format(**recorded_on))
+
+	results = {}
+	before_results = {}
+	failed = False
+
+	print('{:<24} {:>9} {:>10} {:>9} {:>9} {:>10}  {}'.format('piece', 'seconds', 'first byte', 'wall', 'rss mb', 'triangles', 'baseline'))
+	for name in names:
+		with tempfile.TemporaryDirectory() as work_dir:
+			result = run_piece(args.freecad_cmd, os.path.join(corpus_dir, name + '.csv'), work_dir)
+		results[name] = result
+
+		if name in baseline:
+			problems = regressions(result, baseline[name], args.threshold)
+			failed = failed or bool(problems)
+			comparison = '; '.join(problems) or 'ok'
+			if result['seconds'] and baseline[name].get('seconds'):
+				comparison += ' ({:+.0%} seconds)'.format(result['seconds'] / baseline[name]['seconds'] - 1)
+		else:
+			comparison = 'no baseline' if result['status'] == 'ok' else result['status']
+
+		if before_script:
+			with tempfile.TemporaryDirectory() as work_dir:
+				before = run_piece(args.freecad_cmd, os.path.join(corpus_dir, name + '.csv'), work_dir, before_script)
+			before_results[name] = before
+			if before['seconds'] and result['seconds']:
+				comparison += '; before {} s, after {} s ({:+.0%})'.format(before['seconds'], result['seconds'], result['seconds'] / before['seconds'] - 1)
+			else:
+				comparison += '; before ' + before['status']
+
+		print('{:<24} {:>9} {:>10} {:>9} {:>9} {:>10}  {}'.format(name, *[str(result[measure]) for measure in ('seconds', 'first_byte_seconds', 'wall_seconds', 'rss_mb', 'triangles')], comparison))
+
+	if args.output:
+		with open(args.output, 'w') as output_file:
+			json.dump({'recorded_on': machine, 'before_revision': args.before, 'pieces': results, 'before': before_results}, output_file, indent=1, sort_keys=True)
+
+	if args.update:
+		# a piece that failed, e.g. with FreeCADCmd missing, keeps its old baseline
+		baseline.update((name, result) for name, result in results.items() if result['status'] == 'ok')
+		if not baseline:
+			print('No piece generated, baseline not written')
+			return 1
+		with open(baseline_path, 'w') as baseline_file:
+			json.dump({'recorded_on': machine, 'pieces': baseline}, baseline_file, indent=1, sort_keys=True)
+		print('Baseline updated:', baseline_path)
+
+	return 1 if failed and not args.update else 0
+
+if __name__ == '__main__':
+	sys.exit(main())
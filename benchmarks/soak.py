@@ -0,0 +1,55 @@
+'''
+Soak test of document lifecycle: generates the benchmark corpus over and over in one
+FreeCAD process and samples its resident memory, which should stay flat once the first
+pass has warmed the profile cache. Exits with status 1 if any piece failed, if memory
+grew by more than TUBEGEN_SOAK_GROWTH (default 0.1) between the end of the first pass
+and the last sample, or if a document was left open.
+
+Run with FreeCADCmd benchmarks/soak.py, TUBEGEN_SOAK_PIECES sets the number of pieces
+(default 2000). Resident memory is read from /proc, or psutil where that is installed.
+'''
+
+import os, sys, tempfile
+
+benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(benchmark_dir))
+
+os.environ.pop('TUBEGEN_CACHE', None)  # every piece is generated, never fetched
+import tubegen
+
+pieces = int(os.environ.get('TUBEGEN_SOAK_PIECES', 2000))
+growth_allowed = float(os.environ.get('TUBEGEN_SOAK_GROWTH', 0.1))
+
+# resident memory of this process in mb
+def rss_mb():
+
+	try:
+		with open('/proc/self/statm') as statm:
+			return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576
+	except OSError:
+		import psutil
+		return psutil.Process().memory_info().rss / 1048576
+
+corpus_dir = os.path.join(benchmark_dir, 'corpus')
+corpus = [os.path.join(corpus_dir, name) for name in sorted(os.listdir(corpus_dir)) if name.endswith('.csv')]
+
+samples = []
+errors = 0
+
+with tempfile.TemporaryDirectory() as stl_dir:
+	stl_file = os.path.join(stl_dir, 'soak.stl')
+
+	for piece in range(pieces):
+		seconds, status = tubegen.run_piece(corpus[piece % len(corpus)], stl_file)
+		if status != 'ok':
+			errors += 1
+
+		# sample after each pass over the corpus
+		if (piece + 1) % len(corpus) == 0 or piece + 1 == pieces:
+			samples.append((piece + 1, rss_mb(), len(tubegen.App.listDocuments())))
+			print('Soak: {} pieces, {:.1f} mb, {} documents open'.format(*samples[-1]), flush=True)
+
+growth = (samples[-1][1] - samples[0][1]) / samples[0][1]
+print('Soak: {} pieces, {} errors, memory grew {:.1%} after the first pass'.format(pieces, errors, growth))
+
+sys.exit(1 if errors or growth > growth_allowed or samples[-1][2] > 0 else 0)
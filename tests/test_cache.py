@@ -0,0 +1,31 @@
+import tubegen
+
+parameters = {'material_type': 1, 'diameter': 50.8, 'wall': 3.048, 'length': 1219.2, 'e1flat': 'True'}
+features = [[0, 25.4, 0, 12.7]]
+
+def test_float_noise_gives_the_same_key():
+	noisy = dict(parameters, diameter=50.8 + 1e-9)
+
+	assert tubegen.piece_key(noisy, [[0, 25.4 + 1e-9, 0, 12.7]]) == tubegen.piece_key(parameters, features)
+
+def test_dimensions_and_features_change_the_key():
+	key = tubegen.piece_key(parameters, features)
+
+	assert tubegen.piece_key(dict(parameters, wall=3.2), features) != key
+	assert tubegen.piece_key(parameters, features + [[0, 50.8, 0, 12.7]]) != key
+
+def test_output_settings_change_the_key(monkeypatch):
+	key = tubegen.piece_key(parameters, features)
+
+	monkeypatch.setattr(tubegen, 'engine', 'direct')
+	assert tubegen.piece_key(parameters, features) != key
+
+	monkeypatch.setattr(tubegen, 'engine', 'partdesign')
+	monkeypatch.setattr(tubegen, 'chord_tolerance', tubegen.chord_tolerance * 2)
+	assert tubegen.piece_key(parameters, features) != key
+
+def test_cache_version_changes_the_key(monkeypatch):
+	key = tubegen.piece_key(parameters, features)
+
+	monkeypatch.setattr(tubegen, 'cache_version', tubegen.cache_version + 1)
+	assert tubegen.piece_key(parameters, features) != key
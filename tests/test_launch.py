@@ -0,0 +1,21 @@
+import sys, types
+
+import tubegen
+
+def test_plain_python_is_not_a_freecad_launch(monkeypatch):
+	monkeypatch.delitem(sys.modules, 'FreeCAD', raising=False)
+	monkeypatch.setattr(sys, 'argv', ['python', tubegen.__file__])
+
+	assert not tubegen.launched_by_freecad()
+
+def test_freecad_started_with_tubegen_runs_it(monkeypatch):
+	monkeypatch.setitem(sys.modules, 'FreeCAD', types.ModuleType('FreeCAD'))
+	monkeypatch.setattr(sys, 'argv', ['FreeCADCmd', tubegen.__file__])
+
+	assert tubegen.launched_by_freecad()
+
+def test_script_importing_tubegen_under_freecad_does_not_run_it(monkeypatch):
+	monkeypatch.setitem(sys.modules, 'FreeCAD', types.ModuleType('FreeCAD'))
+	monkeypatch.setattr(sys, 'argv', ['FreeCADCmd', 'benchmarks/soak.py'])
+
+	assert not tubegen.launched_by_freecad()
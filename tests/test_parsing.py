@@ -0,0 +1,75 @@
+import pytest
+
+import tubegen
+
+def parameter_row(**values):
+	row = ['0'] * 48
+	for column, value in values.items():
+		row[int(column[1:])] = str(value)
+	return row
+
+def test_parameters_are_converted_to_mm():
+	parameters = tubegen.parse_parameters(parameter_row(c2=1, c5=2, c6=0.12, c8=48, c10=90, c13=45, c27='True', c28='True', c46=1, c47=1))
+
+	assert parameters['material_type'] == 1
+	assert parameters['diameter'] == pytest.approx(50.8)
+	assert parameters['length'] == pytest.approx(48 * 25.4)
+	assert parameters['e2angle'] == 45
+
+def test_typed_pieces_have_one_thickness():
+	parameters = tubegen.parse_parameters(parameter_row(c2=6, c6=0.3, c43=4, c44=4))
+
+	assert parameters['flange'] == parameters['wall'] == pytest.approx(0.3 * 25.4)
+
+def test_rectangular_rotation_offset_is_swapped():
+	assert tubegen.parse_parameters(parameter_row(c2=2, c7=90))['roffset'] == 270
+	assert tubegen.parse_parameters(parameter_row(c2=2, c7=270))['roffset'] == 90
+
+def test_short_parameter_row_is_rejected():
+	with pytest.raises(ValueError, match='47 columns'):
+		tubegen.parse_parameters(['0'] * 47)
+
+def test_unknown_designation_is_rejected():
+	with pytest.raises(ValueError, match='NOPE'):
+		tubegen.parse_parameters(parameter_row(c2=1) + ['NOPE'])
+
+def test_feature_columns_follow_the_header():
+	header = list(reversed(tubegen.feature_data_needed))
+
+	assert tubegen.feature_columns(header) == list(reversed(range(len(header))))
+
+def test_missing_feature_columns_are_named():
+	with pytest.raises(ValueError, match='Diameter, Seperation'):
+		tubegen.feature_columns([header for header in tubegen.feature_data_needed if header not in ('Diameter', 'Seperation')])
+
+def write(path, text):
+	path.write_text(text)
+	return str(path)
+
+def test_cut_list_is_told_from_a_manifest(tmp_path):
+	assert tubegen.is_cut_list(write(tmp_path / 'cuts.csv', '\n#piece,A-101\nTitle\n'))
+	assert not tubegen.is_cut_list(write(tmp_path / 'job.csv', 'a.csv,a.stl\n'))
+	assert not tubegen.is_cut_list(str(tmp_path))
+
+def test_cut_list_pieces_are_streamed_and_numbered(tmp_path):
+	cut_list = write(tmp_path / 'cuts.csv', '#piece,A-101\nTitle\n1,2\n#piece\nTitle\n')
+
+	assert list(tubegen.cut_list_pieces(cut_list)) == [('A-101', [['Title'], ['1', '2']]), ('2', [['Title']])]
+
+def test_cut_list_piece_ids_are_sanitized(tmp_path):
+	cut_list = write(tmp_path / 'cuts.csv', '#piece,../x\\y:z\nTitle\n')
+
+	assert list(tubegen.cut_list_pieces(cut_list)) == [('__x_y_z', [['Title']])]
+
+def test_repeated_piece_id_is_rejected(tmp_path):
+	cut_list = write(tmp_path / 'cuts.csv', '#piece,A\n#piece,a/b\n#piece,a_b\n')
+
+	with pytest.raises(ValueError, match='a_b'):
+		list(tubegen.batch_pieces(cut_list))
+
+def test_piece_without_feature_header_has_no_features():
+	rows = [['Title'], parameter_row(c2=1, c5=2, c6=0.12, c8=48)]
+
+	assert tubegen.parse_piece(rows)[1] == []
+	assert tubegen.parse_piece(rows + [[]])[1] == []
+	assert tubegen.parse_piece(rows + [['', '']])[1] == []
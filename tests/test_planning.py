@@ -0,0 +1,91 @@
+import numpy as np
+
+import tubegen
+
+# feature row in feature_data_needed order, inch dimensions as PieceMaker writes them
+def feature(desc_type=0, xdist=1, diameter=0.5, instances=1, increment=0, orientations=(1, 0, 0, 0), sep=0, ydist=0, rows=1, row_increment=0, angles=1, angle_increment=0):
+	return [desc_type, xdist, 0, diameter, sep, ydist, increment, instances] + list(orientations) + [row_increment, rows, angle_increment, angles]
+
+def test_orientations_expand_to_faces():
+	plan = tubegen.plan_features([feature(orientations=(1, 0, 1, 0)), feature(desc_type=1, orientations=(0, 1, 0, 0))], 100, 1)
+
+	assert plan['feature'].tolist() == [0, 0, 1]
+	assert plan['face'].tolist() == [1, 3, 2]
+
+def test_flat_bar_circles_move_to_the_270_face():
+	plan = tubegen.plan_features([feature()], 100, 4)
+
+	assert plan['face'].tolist() == [4]
+
+def test_undefined_features_are_not_cut():
+	plan = tubegen.plan_features([feature(desc_type=7), feature()], 100, 1)
+
+	assert plan['feature'].tolist() == [1]
+
+def test_linear_array_is_converted_to_mm():
+	plan = tubegen.plan_features([feature(xdist=1, instances=3, increment=2)], 100, 1)
+
+	assert np.allclose(plan['x'], [-100 + 25.4, -100 + 3 * 25.4, -100 + 5 * 25.4])
+	assert np.allclose(plan['diameter'], 12.7)
+
+def test_rows_and_angular_array():
+	plan = tubegen.plan_features([feature(rows=2, row_increment=1, angles=4, angle_increment=90)], 100, 1)
+
+	assert len(plan['x']) == 8
+	assert np.allclose(sorted(set(plan['angle'].tolist())), [0, 90, 180, 270])
+	assert np.allclose(sorted(set(plan['y'].tolist())), [0, 25.4])
+
+def test_angular_array_is_planned_as_a_polar_pattern():
+	plan = tubegen.plan_features([feature(angles=4, angle_increment=90)], 100, 1)
+
+	assert plan['step'].tolist() == [0, 1, 2, 3]
+	assert set(plan['angle_instances'].tolist()) == {4}
+	assert np.allclose(plan['angle_increment'], 90)
+
+def test_polar_array_reduces_to_one_turn():
+	assert tubegen.polar_array(4, -45) == (4, -45)
+	assert tubegen.polar_array(3, 405) == (3, 45)
+	assert tubegen.polar_array(6, 90) == (4, 90)
+	assert tubegen.polar_array(3, 720) is None
+	assert tubegen.polar_array(1, 30) is None
+
+def test_linear_array_is_planned_as_a_linear_pattern():
+	plan = tubegen.plan_features([feature(instances=3, increment=2)], 100, 1)
+
+	assert plan['step_x'].tolist() == [0, 1, 2]
+	assert set(plan['x_instances'].tolist()) == {3}
+	assert np.allclose(plan['x_increment'], 50.8)
+
+# cut indexes of each group of a plan
+def groups(plan):
+	return [cuts.tolist() for cuts in tubegen.feature_groups(plan, np.ones(len(plan['x']), dtype=int))]
+
+def test_groups_sketch_array_seeds_per_feature(monkeypatch):
+	monkeypatch.setattr(tubegen, 'merge_features', False)
+	plan = tubegen.plan_features([feature(instances=3, increment=1), feature(xdist=10)], 100, 1)
+
+	assert groups(plan) == [[0], [3]]
+
+def test_merged_groups_share_face_and_pattern(monkeypatch):
+	monkeypatch.setattr(tubegen, 'merge_features', True)
+	features = [feature(xdist=1), feature(xdist=5), feature(xdist=10, orientations=(0, 1, 0, 0)), feature(xdist=20, angles=2, angle_increment=180)]
+	plan = tubegen.plan_features(features, 100, 1)
+
+	merged = groups(plan)
+
+	assert sorted(len(cuts) for cuts in merged) == [1, 1, 2]
+	assert sorted(plan['feature'][cuts].tolist() for cuts in merged) == [[0, 1], [2], [3]]
+
+def test_merged_groups_drop_identical_profiles(monkeypatch):
+	monkeypatch.setattr(tubegen, 'merge_features', True)
+	rectangle = feature(desc_type=4, xdist=5, diameter=1, sep=0.5)
+	plan = tubegen.plan_features([rectangle, rectangle, feature(desc_type=4, xdist=10, diameter=1, sep=0.5, rows=3, row_increment=1)], 100, 2)
+
+	assert sorted(plan['feature'][cuts].tolist() for cuts in groups(plan)) == [[0, 2]]
+
+def test_unmerged_groups_keep_every_feature(monkeypatch):
+	monkeypatch.setattr(tubegen, 'merge_features', False)
+	rectangle = feature(desc_type=4, xdist=5, diameter=1, sep=0.5)
+	plan = tubegen.plan_features([rectangle, rectangle], 100, 2)
+
+	assert groups(plan) == [[0], [1]]
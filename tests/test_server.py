@@ -0,0 +1,20 @@
+import http.client, http.server, tempfile, threading
+
+import tubegen
+
+def test_failed_piece_returns_its_error_in_the_body(monkeypatch):
+	monkeypatch.setattr(tubegen, 'run_piece', lambda csv_file, stl_file: (0.1, 'error: C:\\Użytkownicy\\piece.csv BRep_API: command not done'))
+
+	server = http.server.HTTPServer(('127.0.0.1', 0), tubegen.PieceHandler)
+	with tempfile.TemporaryDirectory() as scratch_dir:
+		server.scratch_dir = scratch_dir
+		threading.Thread(target=server.handle_request, daemon=True).start()
+
+		connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+		connection.request('POST', '/piece', body=b'piece')
+		response = connection.getresponse()
+
+		assert response.status == 500
+		assert response.read().decode('utf-8') == 'error: C:\\Użytkownicy\\piece.csv BRep_API: command not done'
+
+	server.server_close()
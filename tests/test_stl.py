@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+import pytest
+
+import tubegen
+
+def plain_parameters(**values):
+	parameters = {'material_type': 1, 'diameter': 50, 'wall': 3, 'side1': 0, 'side2': 0, 'cradius': 0, 'length': 200, 'e1angle': 90, 'e2angle': 90, 'e1flat': 'True', 'e2flat': 'True'}
+	parameters.update(values)
+	return parameters
+
+# volume enclosed by triangles wound counter clockwise seen from outside
+def volume(triangles):
+	return np.einsum('ij,ij->i', triangles[:,0], np.cross(triangles[:,1], triangles[:,2])).sum() / 6
+
+# area of a closed loop of points
+def area(loop):
+	return 0.5 * abs(np.dot(loop[:,0], np.roll(loop[:,1], -1)) - np.dot(loop[:,1], np.roll(loop[:,0], -1)))
+
+def test_round_stock_volume_and_axis():
+	triangles = tubegen.plain_stock_mesh(plain_parameters(), [])
+
+	segments = max(tubegen.arc_segments(25, 2 * math.pi), 3)
+	expected = (area(tubegen.circle_loop(25, segments)) - area(tubegen.circle_loop(22, segments))) * 200
+
+	assert volume(triangles) == pytest.approx(expected)
+	assert volume(triangles) == pytest.approx(math.pi * (25 ** 2 - 22 ** 2) * 200, rel=0.01)
+	assert np.allclose(triangles[:,:,0].min(), 0) and np.allclose(triangles[:,:,0].max(), 200)
+	assert np.allclose(np.abs(triangles[:,:,1:]).max(), 25)
+
+def test_rectangular_stock_volume_and_axis():
+	triangles = tubegen.plain_stock_mesh(plain_parameters(material_type=2, side1=40, side2=60, cradius=5), [])
+
+	# inner and outer corners share the fillet radius, so the corners they leave out cancel
+	assert volume(triangles) == pytest.approx((40 * 60 - 34 * 54) * 200, rel=0.01)
+	assert np.allclose(triangles[:,:,0].max(), 200)
+	assert np.allclose(triangles[:,:,1].max(), 30) and np.allclose(triangles[:,:,2].max(), 20)
+
+def test_stock_that_needs_modeling_is_not_meshed():
+	assert tubegen.plain_stock_mesh(plain_parameters(e1angle=45), []) is None
+	assert tubegen.plain_stock_mesh(plain_parameters(e2flat='False'), []) is None
+	assert tubegen.plain_stock_mesh(plain_parameters(material_type=3), []) is None
+	assert tubegen.plain_stock_mesh(plain_parameters(), [[0] * 16]) is None
+
+def test_binary_stl_header_and_triangle_count(tmp_path):
+	stl_file = str(tmp_path / 'piece.stl')
+	triangles = np.array([[[0, 0, 0], [1, 0, 0], [0, 1, 0]], [[0, 0, 0], [0, 1, 0], [0, 0, 1]]], dtype=float)
+
+	written = tubegen.write_binary_stl(stl_file, triangles)
+
+	with open(stl_file, 'rb') as stl:
+		content = stl.read()
+	assert written == len(content) == 84 + 2 * 50
+	assert content[:80] == b'TubeGen'.ljust(80, b' ')
+	assert int.from_bytes(content[80:84], 'little') == 2
+	assert np.allclose(np.frombuffer(content[84:96], dtype='<f4'), [0, 0, 1])
@@ -0,0 +1,35 @@
+import types
+
+import tubegen
+
+# document stand-in counting its recomputes
+class Document:
+
+	def __init__(self):
+		self.recomputes = 0
+
+	def recompute(self):
+		self.recomputes += 1
+
+def modeled(monkeypatch, recompute_mode):
+	document = Document()
+	monkeypatch.setattr(tubegen, 'App', types.SimpleNamespace(ActiveDocument=document))
+	monkeypatch.setattr(tubegen, 'engine', 'partdesign')
+	monkeypatch.setattr(tubegen, 'recompute_mode', recompute_mode)
+	monkeypatch.setattr(tubegen, 'timing', True)
+	monkeypatch.setattr(tubegen, 'stage_times', {})
+	monkeypatch.setattr(tubegen, '__objs__', [], raising=False)  # set once a body is finished
+
+	for feature in range(3):
+		tubegen.recompute()
+	tubegen.export_objects()
+
+	return document.recomputes, tubegen.stage_times['recompute'][0]
+
+def test_each_feature_is_recomputed_and_timed(monkeypatch):
+	assert modeled(monkeypatch, 'each') == (3, 4)
+
+def test_deferred_recompute_is_timed_as_the_recompute_stage(monkeypatch):
+	recomputes, calls = modeled(monkeypatch, 'deferred')
+
+	assert recomputes == 1 and calls == 4
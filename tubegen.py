@@ -9,15 +9,75 @@ Copyright 2020-2021 Electro-Mechanical Integrators, Inc.
 '''
 
 
-# import FreeCAD scripting modules and python tools
-import FreeCAD, PartDesign, Sketcher, Mesh, Part
-import math, os, csv
+# import python tools, FreeCAD's modules are imported by load_freecad once a piece needs modeling
+import math, os, sys, csv, json, time, queue, shutil, hashlib, cProfile, functools, threading, contextlib, subprocess, tempfile, http.server
+
+# when the script started loading, for the time to the first stl byte
+import_start = time.perf_counter()
+
+import numpy as np
+
+# FreeCADCmd and the FreeCAD console have already loaded FreeCAD, plain python imports it on first use
+FreeCAD = App = sys.modules.get('FreeCAD')
+Part = Sketcher = PartDesign = MeshPart = None
 
 
 # instantiante global variables
 sketch_counter = 0
 material_type = 0
 
+'''INSTRUMENTATION'''
+# write per-stage wall times and call counts next to each stl, and optionally a cProfile dump
+timing = bool(os.environ.get('TUBEGEN_TIMING'))
+profiling = bool(os.environ.get('TUBEGEN_PROFILE'))
+
+# calls and seconds of each stage of the piece being generated
+stage_times = {}
+
+# seconds from the script starting to load to the first stl byte written, None until then
+first_byte_seconds = None
+
+# record the calls and wall time of a generation stage, named after the function
+def timed(function):
+
+	@functools.wraps(function)
+	def timed_function(*args, **kwargs):
+		if not timing:
+			return function(*args, **kwargs)
+
+		start = time.perf_counter()
+		try:
+			return function(*args, **kwargs)
+		finally:
+			calls, seconds = stage_times.get(function.__name__, (0, 0.0))
+			stage_times[function.__name__] = (calls + 1, seconds + time.perf_counter() - start)
+
+	return timed_function
+
+# note the time to the first stl written by this process, from the script starting to load
+def record_first_byte():
+
+	global first_byte_seconds
+
+	if first_byte_seconds is None:
+		first_byte_seconds = time.perf_counter() - import_start
+
+# write the stage times of a piece as json next to its stl
+def write_stage_times(csv_file, stl_file, seconds):
+
+	report = {
+		'csv_file': csv_file,
+		'stl_file': stl_file,
+		'engine': engine,
+		'seconds': round(seconds, 6),
+		'first_byte_seconds': round(first_byte_seconds, 6) if first_byte_seconds is not None else None,
+		'stages': {stage: {'calls': calls, 'seconds': round(stage_seconds, 6)} for stage, (calls, stage_seconds) in sorted(stage_times.items(), key=lambda item: -item[1][1])},
+	}
+
+	with open(os.path.splitext(stl_file)[0] + '.timing.json', 'w') as report_file:
+		json.dump(report, report_file, indent=1)
+
+
 # set file location paths and run generation functions
 def set_paths():
 
@@ -37,44 +97,1015 @@ def set_paths():
 	#csv_file = os.path.join(userprofile, 'OneDrive', 'Documents', 'PieceMaker Docs', 'Resources', 'CSV-STL', 'STLFile.csv')
 	#stl_file = os.path.join(userprofile, 'OneDrive', 'Documents', 'PieceMaker Docs', 'Resources', 'CSV-STL', 'PieceDefault.stl')
 
-	# import parameters from csv and run tube generation
-	feat_length, material_type = import_parameters(csv_file)
+	# generate the piece and export it to PieceDefault.stl
+	generate_piece(csv_file, stl_file)
+
+# generate a single piece from its csv and export it to stl_file
+def generate_piece(csv_file, stl_file, rows=None):
+
+	stage_times.clear()
+	profiler = cProfile.Profile() if profiling else None
+	start = time.perf_counter()
+
+	if profiler:
+		profiler.enable()
+
+	try:
+		build_piece(csv_file, stl_file, rows)
+	finally:
+		if profiler:
+			profiler.disable()
+			profiler.dump_stats(os.path.splitext(stl_file)[0] + '.prof')
+		if timing:
+			write_stage_times(csv_file, stl_file, time.perf_counter() - start)
+
+# read, model and mesh a piece, and export it to stl_file
+def build_piece(csv_file, stl_file, rows=None):
+
+	# import parameters and features from csv, or from one piece's rows of a cut list
+	parameters, features = read_piece(csv_file) if rows is None else parse_piece(rows)
+
+	# reuse the stl of an identical piece if one has been generated before
+	if cache_dir:
+		key = piece_key(parameters, features)
+		if cache_fetch(key, stl_file):
+			return
+
+	# plain stock is meshed directly, anything else is modeled in FreeCAD
+	triangles = plain_stock_mesh(parameters, features) if analytic_meshing else None
+	if triangles is None:
+
+		# show round and rectangular tube in the viewer before anything is modeled
+		previewed = preview and write_stock_preview(parameters, stl_file)
+
+		# run tube and feature generation, previewing other stock once the tube is modeled
+		feat_length, material_type = build_tube(parameters)
+		if preview and not previewed:
+			write_binary_stl(stl_file, tessellate_shape(current_shape(), preview_linear_deflection, preview_angular_deflection))
+		build_features(features, feat_length, material_type)
+
+		# tessellate the generated tube
+		triangles = tessellate(export_objects())
+
+	# export the mesh to the stl file, replacing any preview
+	stl_bytes = write_binary_stl(stl_file, triangles)
+	print('Export: {} triangles, {} bytes'.format(len(triangles), stl_bytes))
+
+	if cache_dir:
+		cache_store(key, stl_file)
+
+
+'''STL CACHE'''
+# folder of previously generated stl files, caching is off unless TUBEGEN_CACHE is set
+cache_dir = os.environ.get('TUBEGEN_CACHE')
+
+# size in MB the cache folder is trimmed back to, least recently used files first
+cache_max_mb = float(os.environ.get('TUBEGEN_CACHE_MB', '500'))
+
+# bump in every change to the generated geometry or mesh, so stl files and sections from older versions are not reused
+# 3: angle iron, flat bar and C-channel sketched as one closed profile with filleted bends
+# 4: catalog I-beams with their own flange thickness
+cache_version = 4
+
+# cache hits and misses in this process
+cache_hits = 0
+cache_misses = 0
+
+# hash the normalized piece parameters and features, and every setting that changes the exported mesh, into a cache key
+def piece_key(parameters, features):
+
+	# round away float noise so equal pieces typed slightly differently still match
+	normalized = {
+		'version': cache_version,
+		'parameters': dict((name, round(value, 6) if isinstance(value, float) else value) for name, value in parameters.items()),
+		'features': [[round(value, 6) for value in feature] for feature in features],
+		'settings': output_settings(),
+	}
+
+	return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+# modeling and meshing settings a piece's stl depends on, looked up when the key is made as they are defined further down
+def output_settings():
+
+	return {
+		'engine': engine,
+		'recompute_mode': recompute_mode,
+		'cut_mode': cut_mode,
+		'fuzzy_tolerance': fuzzy_tolerance,
+		'merge_features': merge_features,
+		'analytic_meshing': analytic_meshing,
+		'chord_tolerance': chord_tolerance,
+		'linear_deflection': linear_deflection,
+		'angular_deflection': angular_deflection,
+	}
+
+# copy the cached stl for key to stl_file, returning False on a miss
+@timed
+def cache_fetch(key, stl_file):
+
+	global cache_hits, cache_misses
+
+	cached_file = os.path.join(cache_dir, key + '.stl')
+
+	try:
+		shutil.copyfile(cached_file, stl_file)
+		os.utime(cached_file)  # mark as most recently used
+	except OSError:
+		cache_misses += 1
+		record_cache_stats(0, 1)
+		return False
+
+	cache_hits += 1
+	record_cache_stats(1, 0)
+	record_first_byte()
+	return True
+
+# add a generated stl to the cache, then evict the least recently used files over the size limit
+@timed
+def cache_store(key, stl_file):
+
+	os.makedirs(cache_dir, exist_ok=True)
+	cached_file = os.path.join(cache_dir, key + '.stl')
+
+	# copy then rename, parallel workers may store the same piece at once
+	temp_file = cached_file + '.%d.tmp' % os.getpid()
+	shutil.copyfile(stl_file, temp_file)
+	os.replace(temp_file, cached_file)
+
+	entries = []
+	for name in os.listdir(cache_dir):
+		if name.endswith('.stl'):
+			try:
+				stat = os.stat(os.path.join(cache_dir, name))
+			except OSError:  # evicted by another process
+				continue
+			entries.append((stat.st_mtime, stat.st_size, os.path.join(cache_dir, name)))
+
+	cache_size = sum(entry[1] for entry in entries)
+
+	for mtime, size, path in sorted(entries):
+		if cache_size <= cache_max_mb * 1024 * 1024:
+			break
+		try:
+			os.remove(path)
+		except OSError:
+			pass
+		cache_size -= size
+
+# seconds after which a stats lock is taken to be left behind by a process that was killed holding it
+stats_lock_timeout = 10.0
+
+# hold an exclusive lock file while a block runs, shared by every process and thread using the cache folder
+@contextlib.contextmanager
+def file_lock(lock_file):
+
+	while True:
+		try:
+			os.close(os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+			break
+		except FileExistsError:
+			try:
+				if time.time() - os.path.getmtime(lock_file) > stats_lock_timeout:
+					os.remove(lock_file)
+					continue
+			except OSError:  # released in the meantime
+				continue
+			time.sleep(0.005)
+
+	try:
+		yield
+	finally:
+		os.remove(lock_file)
+
+# add to the hit and miss totals kept in the cache folder across runs, locked so parallel workers and the server keep every count
+def record_cache_stats(hits, misses):
+
+	os.makedirs(cache_dir, exist_ok=True)
+	stats_file = os.path.join(cache_dir, 'stats.json')
+
+	with file_lock(stats_file + '.lock'):
+		try:
+			with open(stats_file) as statsfile:
+				stats = json.load(statsfile)
+		except (OSError, ValueError):
+			stats = {'hits': 0, 'misses': 0}
+
+		stats['hits'] += hits
+		stats['misses'] += misses
+
+		# replace the file whole, so a reader never sees it half written
+		temp_file = stats_file + '.%d.tmp' % os.getpid()
+		with open(temp_file, 'w') as statsfile:
+			json.dump(stats, statsfile)
+		os.replace(temp_file, stats_file)
+
+
+'''BATCH GENERATION'''
+# list the (csv, stl) file pairs of a job, which is either a folder of piece csvs or a manifest file
+def job_pieces(job, out_dir=None):
+
+	pieces = []
+
+	if os.path.isdir(job):  # folder, every csv in it is a piece
+		for name in sorted(os.listdir(job)):
+			if name.lower().endswith('.csv'):
+				pieces.append([os.path.join(job, name)])
+
+	else:  # manifest, one piece csv per row with an optional stl path, relative to the manifest
+		with open(job) as manifest:
+			for row in csv.reader(manifest):
+				if len(row) == 0 or row[0].strip() == '' or row[0].startswith('#'):
+					continue
+				pieces.append([os.path.join(os.path.dirname(job), field.strip()) for field in row[:2]])
+
+	# default stl name is the csv name, written next to it or into out_dir
+	for piece in pieces:
+		if len(piece) == 1:
+			stl_name = os.path.splitext(os.path.basename(piece[0]))[0] + '.stl'
+			piece.append(os.path.join(out_dir or os.path.dirname(piece[0]), stl_name))
+
+	return [tuple(piece) for piece in pieces]
+
+# marker row starting each piece of a cut list, followed by the piece id
+cut_list_marker = '#piece'
+
+# whether a job file is a cut list of many pieces rather than a manifest
+def is_cut_list(job):
+
+	if os.path.isdir(job):
+		return False
+
+	with open(job, newline='') as csvfile:
+		for row in csv.reader(csvfile):
+			if row and row[0].strip():
+				return row[0].strip() == cut_list_marker
+
+	return False
+
+# piece id made safe as a file name, so it cannot climb out of or pick the stl folder
+def safe_piece_id(piece_id):
+
+	for unsafe in ('/', '\\', ':', '..'):
+		piece_id = piece_id.replace(unsafe, '_')
+
+	return piece_id
+
+# stream the pieces of a cut list, yielding each piece's id and rows, one piece in memory at a time
+def cut_list_pieces(cut_list):
+
+	with open(cut_list, newline='') as csvfile:
+		piece_count = 0
+		piece_id = None
+		piece_ids = set()
+		rows = []
+
+		for row in csv.reader(csvfile):
+			if row and row[0].strip() == cut_list_marker:
+				if piece_id is not None:
+					yield piece_id, rows
+
+				# pieces without an id are numbered
+				piece_count += 1
+				piece_id = safe_piece_id(row[1].strip()) if len(row) > 1 and row[1].strip() else str(piece_count)
+				if piece_id in piece_ids:
+					raise ValueError('piece id {} is used twice in {}'.format(piece_id, cut_list))
+				piece_ids.add(piece_id)
+				rows = []
+
+			elif piece_id is not None:
+				rows.append(row)
+
+		if piece_id is not None:
+			yield piece_id, rows
+
+# pieces of a job folder, manifest or cut list as the name, csv file, stl file and cut list rows of each
+def batch_pieces(job, out_dir=None):
+
+	if is_cut_list(job):
+		# read the ids through once first, so a repeated id fails the job before any piece is written
+		for piece in cut_list_pieces(job):
+			pass
+
+		stl_dir = out_dir or os.path.dirname(os.path.abspath(job))
+		for piece_id, rows in cut_list_pieces(job):
+			yield piece_id, job, os.path.join(stl_dir, piece_id + '.stl'), rows
+
+	else:
+		for csv_file, stl_file in job_pieces(job, out_dir):
+			yield os.path.basename(csv_file), csv_file, stl_file, None
+
+# generate one piece of a job, closing its document afterwards, and return the time taken and status
+def run_piece(csv_file, stl_file, rows=None):
+
+	# remember open documents so only the ones made for this piece are closed afterwards
+	open_documents = document_names()
+	start = time.perf_counter()
+
+	try:
+		generate_piece(csv_file, stl_file, rows)
+		status = 'ok'
+	except Exception as error:  # a bad piece should not stop the rest of the job
+		status = 'error: ' + ' '.join(str(error).split())
+
+	seconds = time.perf_counter() - start
+
+	# close this piece's document and drop its shapes, so long jobs run in flat memory
+	release_piece(open_documents)
+
+	return seconds, status
+
+# write a per-piece timing report into the job's output folder
+def write_timing(job, out_dir, header, rows):
+
+	# the report goes next to the generated stl files
+	if out_dir:
+		report_dir = out_dir
+	elif os.path.isdir(job):
+		report_dir = job
+	else:
+		report_dir = os.path.dirname(os.path.abspath(job))
+
+	with open(os.path.join(report_dir, 'batch_timing.csv'), 'w', newline='') as report:
+		report_writer = csv.writer(report)
+		report_writer.writerow(header)
+		for row in rows:
+			report_writer.writerow(['%.3f' % field if isinstance(field, float) else field for field in row])
+
+# generate every piece of a job in this FreeCAD process, writing one stl per piece and a timing report
+def batch_generate(job, out_dir=None):
+
+	if out_dir:
+		os.makedirs(out_dir, exist_ok=True)
+
+	results = []
+	batch_start = time.perf_counter()
+
+	for name, csv_file, stl_file, rows in batch_pieces(job, out_dir):
+		seconds, status = run_piece(csv_file, stl_file, rows)
+		print('Piece: ', name, '%.3f s' % seconds, status)
+		results.append((name if rows is not None else csv_file, stl_file, seconds, status))
+
+	print('Batch: ', len(results), 'pieces', '%.3f s' % (time.perf_counter() - batch_start))
+
+	if cache_dir:
+		print('Cache: ', cache_hits, 'hits', cache_misses, 'misses')
+
+	write_timing(job, out_dir, ['csv_file', 'stl_file', 'seconds', 'status'], results)
+
+	return results
+
+
+'''PARALLEL GENERATION'''
+# headless FreeCAD executable used to start worker processes
+freecad_cmd = os.environ.get('TUBEGEN_FREECADCMD', 'FreeCADCmd')
+
+# prefix of the line a worker prints when it has finished a piece
+result_marker = 'TUBEGEN_RESULT '
+
+# serve pieces for a parallel driver, reading one tab separated csv and stl path per line on stdin
+def worker_loop():
+
+	for line in sys.stdin:
+		if line.strip() == '':
+			continue
+
+		csv_file, stl_file = line.rstrip('\n').split('\t')
+		seconds, status = run_piece(csv_file, stl_file)
+
+		print(result_marker + json.dumps([seconds, status]), flush=True)
+
+# start a headless FreeCAD worker process, with a thread queueing its output lines
+def start_worker(worker_number=0):
+
+	env = dict(os.environ, TUBEGEN_WORKER='1', TUBEGEN_WORKER_NUMBER=str(worker_number))  # the number picks the worker's processors for parallel booleans
+	env.pop('TUBEGEN_JOB', None)
+
+	worker = subprocess.Popen([freecad_cmd, os.path.abspath(__file__)], stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, universal_newlines=True, bufsize=1)
+
+	# stdout is read on its own thread so waiting for a piece can time out
+	lines = queue.Queue()
+	threading.Thread(target=read_lines, args=(worker.stdout, lines), daemon=True).start()
+
+	return worker, lines
+
+# copy a worker's output lines into a queue, None marks the worker exiting
+def read_lines(stream, lines):
+
+	for line in stream:
+		lines.put(line)
+
+	lines.put(None)
+
+# stop a worker process, killing it if it does not exit on its own
+def stop_worker(worker, kill=False):
+
+	if not kill:
+		try:
+			worker.stdin.close()
+			worker.wait(10)
+		except (OSError, subprocess.TimeoutExpired):
+			kill = True
+
+	if kill:
+		worker.kill()
+		worker.wait()
+
+# feed pieces to one worker process until the job queue is empty
+def drive_worker(worker_number, pieces, results, timeout):
+
+	worker, lines = start_worker(worker_number)
+
+	while True:
+		try:
+			csv_file, stl_file = pieces.get_nowait()
+		except queue.Empty:
+			break
+
+		start = time.perf_counter()
+		status = None
+
+		try:
+			worker.stdin.write(csv_file + '\t' + stl_file + '\n')
+			worker.stdin.flush()
+		except OSError:
+			status = 'error: worker exited'
+
+		# wait for the result line, ignoring anything else the worker prints
+		while status is None:
+			remaining = None
+			if timeout:
+				remaining = timeout - (time.perf_counter() - start)
+
+			try:
+				if remaining is not None and remaining <= 0:
+					raise queue.Empty
+				line = lines.get(timeout=remaining)
+			except queue.Empty:
+				status = 'timeout'
+				break
+
+			if line is None:
+				status = 'error: worker exited'
+			elif line.startswith(result_marker):
+				seconds, status = json.loads(line[len(result_marker):])
+
+		# a timed out or crashed worker is replaced so the rest of the job keeps going
+		if status == 'timeout' or status == 'error: worker exited':
+			stop_worker(worker, kill=True)
+			seconds = time.perf_counter() - start
+			worker, lines = start_worker(worker_number)
+
+		print('Piece: ', os.path.basename(csv_file), 'worker', worker_number, '%.3f s' % seconds, status)
+		results.append((csv_file, stl_file, seconds, status, worker_number))
+
+	stop_worker(worker)
+
+# generate a job across a pool of headless FreeCAD worker processes, each with its own documents
+def parallel_generate(job, out_dir=None, workers=None, timeout=None):
+
+	if out_dir:
+		os.makedirs(out_dir, exist_ok=True)
+
+	pieces = queue.Queue()
+	for piece in job_pieces(job, out_dir):
+		pieces.put(piece)
+
+	# default to one worker per core, but no more workers than pieces
+	workers = max(1, min(workers or os.cpu_count() or 1, pieces.qsize()))
+
+	results = []
+	batch_start = time.perf_counter()
+
+	threads = [threading.Thread(target=drive_worker, args=(number, pieces, results, timeout)) for number in range(workers)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+	batch_seconds = time.perf_counter() - batch_start
+	print('Batch: ', len(results), 'pieces', workers, 'workers', '%.3f s' % batch_seconds)
+
+	# per-worker throughput
+	for number in range(workers):
+		worker_results = [result for result in results if result[4] == number]
+		busy_seconds = sum(result[2] for result in worker_results)
+		per_minute = 60 * len(worker_results) / busy_seconds if busy_seconds else 0
+		print('Worker: ', number, len(worker_results), 'pieces', '%.3f s busy' % busy_seconds, '%.1f pieces/min' % per_minute)
+
+	write_timing(job, out_dir, ['csv_file', 'stl_file', 'seconds', 'status', 'worker'], results)
+
+	return results
+
+
+'''GENERATION SERVER'''
+# generate pieces posted over http, the request body is the contents of a piece csv and the reply is the stl
+class PieceHandler(http.server.BaseHTTPRequestHandler):
+
+	def do_POST(self):
+
+		if self.path.rstrip('/') != '/piece':
+			self.send_error(404)
+			return
+
+		# the generators read a csv file, so the posted piece is written to the server's scratch folder
+		csv_file = os.path.join(self.server.scratch_dir, 'STLFile.csv')
+		stl_file = os.path.join(self.server.scratch_dir, 'PieceDefault.stl')
+
+		with open(csv_file, 'wb') as csvfile:
+			csvfile.write(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+		if os.path.exists(stl_file):
+			os.remove(stl_file)
+
+		seconds, status = run_piece(csv_file, stl_file)
+
+		# the reason line only takes latin-1, so the error, which may hold any path or OpenCASCADE message, goes in the body
+		if status != 'ok':
+			message = status.encode('utf-8')
+			self.send_response(500)
+			self.send_header('Content-Type', 'text/plain; charset=utf-8')
+			self.send_header('Content-Length', str(len(message)))
+			self.end_headers()
+			self.wfile.write(message)
+			return
+
+		with open(stl_file, 'rb') as stlfile:
+			stl = stlfile.read()
+
+		self.send_response(200)
+		self.send_header('Content-Type', 'model/stl')
+		self.send_header('Content-Length', str(len(stl)))
+		self.send_header('X-TubeGen-Seconds', '%.3f' % seconds)
+		self.end_headers()
+		self.wfile.write(stl)
+
+# keep FreeCAD loaded and serve pieces until stopped, requests are handled one at a time
+def serve(port=8765, host='127.0.0.1'):
+
+	server = http.server.HTTPServer((host, port), PieceHandler)
+	server.scratch_dir = tempfile.mkdtemp(prefix='tubegen')
+
+	print('TubeGen server: ', 'http://%s:%d/piece' % (host, port), flush=True)
+	server.serve_forever()
+
+
+'''PROFILE CACHE'''
+# cross-section faces of stock already sketched in this process, with the direction they are padded in
+profile_cache = {}
+
+# most cross-sections kept, the oldest is dropped first
+profile_cache_size = 64
+
+# pad the cached cross-section of a stock as the body's base feature, returning False if it has not been sketched yet
+@timed
+def cached_profile(profile_key, length):
+
+	global direct_solid
+
+	if profile_key not in profile_cache:
 
-	# import features from csv and run feature generation
-	import_features(csv_file, feat_length, material_type)
+		# catalog stock starts from its precomputed cross-section, padded along the normal of the front plane it was sketched on
+		face = load_section()
+		if face is None:
+			return False
+		remember_profile(profile_key, face, origin_plane('XZ_Plane').Rotation.multVec(App.Vector(0,0,1)))
 
-	# export generated tube to PieceDefault.stl
-	Mesh.export(__objs__, stl_file)
+	face, direction = profile_cache[profile_key]
+
+	if engine == 'direct':
+		direct_solid = face.extrude(direction * length)
+		return True
+
+	# extrude the face directly, skipping the sketch, its constraints and fillets
+	profile = App.ActiveDocument.addObject('Part::Feature', 'Profile')
+	profile.Shape = face.extrude(direction * length)
+
+	App.ActiveDocument.Body.BaseFeature = profile
+	if App.ActiveDocument.Body.Tip is None:
+		App.ActiveDocument.Body.Tip = profile
+	recompute()
+
+	return True
+
+# remember the cross-section of a stock from its sketch, and save it for catalog stock
+@timed
+def store_profile(profile_key, sketch):
+
+	# sketches are not solved yet when recomputes are deferred
+	if engine != 'direct' and recompute_mode == 'deferred':
+		sketch.recompute()
+
+	face = sketch_face(sketch)
+
+	# pads extrude along the sketch normal
+	remember_profile(profile_key, face, sketch_normal(sketch))
+	save_section(face)
+
+# add a cross-section to the cache, dropping the oldest to keep long runs over many stocks bounded
+def remember_profile(profile_key, face, direction):
+
+	if len(profile_cache) >= profile_cache_size:
+		del profile_cache[next(iter(profile_cache))]
+
+	profile_cache[profile_key] = (face, direction)
+
+
+'''STOCK CATALOG'''
+# standard stock sizes, a row per designation with its material type and dimensions in inches as PieceMaker writes them
+catalog_file = os.environ.get('TUBEGEN_CATALOG', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stock_catalog.csv'))
+
+# folder of the catalog's precomputed cross-sections, a brep face per designation
+sections_dir = os.environ.get('TUBEGEN_SECTIONS', os.path.join(os.path.dirname(catalog_file), 'sections'))
+
+# dimensions that set the cross-section of each material type, a piece matches a catalog stock when these are equal
+catalog_dimensions = {
+	1: ('diameter', 'wall'),
+	2: ('side1', 'side2', 'wall', 'cradius'),
+	3: ('side1', 'side2', 'wall', 'cradius'),
+	4: ('side1', 'side2', 'wall'),
+	5: ('side1', 'side2', 'wall', 'cradius'),
+	6: ('side1', 'side2', 'wall', 'cradius', 'flange'),
+}
+
+# catalog entries by designation, read on first use
+stock_catalog = None
+
+# designation of the catalog stock being generated, None for stock that is not in the catalog
+current_stock = None
+
+# catalog entries by designation, with dimensions converted to mm
+def load_catalog():
+
+	global stock_catalog
+
+	if stock_catalog is None:
+		stock_catalog = {}
+		if os.path.exists(catalog_file):
+			with open(catalog_file, newline='') as catalogfile:
+				for row in csv.DictReader(catalogfile):
+					entry = {'material_type': int(row['material_type'])}
+					for dimension in ('diameter', 'side1', 'side2', 'wall', 'cradius'):
+						entry[dimension] = float(row[dimension]) * 25.4
+					# I-beams have their own flange thickness, wall is the web, other stock is one thickness throughout
+					entry['flange'] = float(row['flange']) * 25.4 if row.get('flange') else entry['wall']
+					stock_catalog[row['designation']] = entry
+
+	return stock_catalog
+
+# set the parameters' material type and dimensions to a catalog stock's
+def catalog_stock(designation, parameters):
+
+	catalog = load_catalog()
+	if designation not in catalog:
+		raise ValueError('stock designation {} is not in {}'.format(designation, catalog_file))
+
+	parameters.update(catalog[designation])
+
+# designation of the catalog stock with the parameters' dimensions, None if it is not a standard size
+def match_stock(parameters):
+
+	material_type = parameters['material_type']
+
+	for designation, entry in load_catalog().items():
+		if entry['material_type'] == material_type and all(abs(entry[dimension] - parameters[dimension]) < 0.01 for dimension in catalog_dimensions[material_type]):
+			return designation
+
+	return None
+
+# path of a catalog stock's precomputed cross-section, versioned with the cache so a profile change is never served from an older section
+def section_file(designation):
+
+	return os.path.join(sections_dir, '{}.v{}.brep'.format(designation, cache_version))
+
+# precomputed cross-section of the stock being generated, None if it is not catalog stock, not built yet or not a valid face
+@timed
+def load_section():
+
+	if current_stock is None or not os.path.exists(section_file(current_stock)):
+		return None
+
+	# FreeCAD raises its file errors as RuntimeError
+	shape = Part.Shape()
+	try:
+		shape.read(section_file(current_stock))
+	except (OSError, RuntimeError) as error:
+		print('Cannot read cross-section', section_file(current_stock), error)
+		return None
+
+	if len(shape.Faces) != 1 or not shape.isValid():
+		print('Ignoring invalid cross-section', section_file(current_stock))
+		return None
+
+	return shape.Faces[0]
+
+# save the cross-section of the catalog stock being generated, after checking it is one valid face
+@timed
+def save_section(face):
+
+	if current_stock is None or os.path.exists(section_file(current_stock)):
+		return
+
+	if not face.isValid() or face.Area <= 0:
+		print('Not saving invalid cross-section of', current_stock)
+		return
+
+	# write then rename, parallel workers may build the same stock at once
+	# the sections folder may be read-only in an install folder, a section that cannot be saved is sketched again next time
+	temp_file = section_file(current_stock) + '.%d.tmp' % os.getpid()
+	try:
+		os.makedirs(sections_dir, exist_ok=True)
+		face.exportBrep(temp_file)
+		os.replace(temp_file, section_file(current_stock))
+	except (OSError, RuntimeError) as error:
+		print('Cannot save cross-section of', current_stock, error)
+		try:
+			os.remove(temp_file)
+		except OSError:
+			pass
+
+# build the cross-section of every catalog stock that is not saved yet, from a short plain piece of each
+def build_catalog():
+
+	for designation, entry in load_catalog().items():
+		if os.path.exists(section_file(designation)):
+			continue
+
+		parameters = dict(entry, roffset=0, length=25.4, e1join=0, e1angle=90, e2join=0, e2angle=90, e1flat='True', e2flat='True', e1cutside=1, e2cutside=1, stock=designation)
+
+		open_documents = document_names()
+		build_tube(parameters)
+		release_piece(open_documents)
+
+		print('Cross-section:', designation, 'saved' if os.path.exists(section_file(designation)) else 'failed')
+
+
+'''STL MESHING'''
+# mesh plain stock directly instead of modeling it, turned off with TUBEGEN_ANALYTIC=0
+analytic_meshing = os.environ.get('TUBEGEN_ANALYTIC', '1') != '0'
+
+# largest distance in mm an arc's chords may be from the arc
+chord_tolerance = float(os.environ.get('TUBEGEN_CHORD', 0.05))
+
+# tessellation of modeled pieces, largest distance in mm from the surface and largest angle in degrees between adjacent facets
+linear_deflection = float(os.environ.get('TUBEGEN_LINEAR_DEFLECTION', 0.1))
+angular_deflection = float(os.environ.get('TUBEGEN_ANGULAR_DEFLECTION', 28.5))
+
+# write a coarse preview stl before the piece is fully modeled, and the deflections it is tessellated to
+preview = bool(os.environ.get('TUBEGEN_PREVIEW'))
+preview_linear_deflection = float(os.environ.get('TUBEGEN_PREVIEW_DEFLECTION', 1.0))
+preview_angular_deflection = 45.0
+
+# number of chords needed to keep an arc of radius and angle within the chord tolerance
+def arc_segments(radius, angle):
+
+	if radius <= 0:
+		return 0
+
+	chord_angle = 2 * math.acos(max(1 - chord_tolerance / radius, -1))
+
+	return max(int(math.ceil(angle / chord_angle)), 1)
+
+# points around a circle, counter clockwise from the positive x axis
+def circle_loop(radius, segments):
+
+	angles = np.linspace(0, 2 * math.pi, segments, endpoint=False)
+
+	return np.column_stack((radius * np.cos(angles), radius * np.sin(angles)))
+
+# points around a rectangle centred on the origin with corners filleted to radius, counter clockwise from the bottom right corner
+def rounded_rectangle_loop(half_x, half_y, radius, segments):
+
+	centers = [(half_x - radius, -half_y + radius), (half_x - radius, half_y - radius), (-half_x + radius, half_y - radius), (-half_x + radius, -half_y + radius)]
+
+	points = []
+	for corner, (center_x, center_y) in enumerate(centers):
+		angles = np.linspace((corner - 1) * math.pi / 2, corner * math.pi / 2, segments + 1)
+		points.append(np.column_stack((center_x + radius * np.cos(angles), center_y + radius * np.sin(angles))))
+
+	return np.concatenate(points)
+
+# triangles of a profile extruded along x from 0 to length, the outer and inner loops matched point for point and counter clockwise
+def extrude_loops(outer, inner, length):
+
+	count = len(outer)
+	following = np.roll(np.arange(count), -1)
+
+	# loops in 3d, x along the tube and the profile in y and z
+	def ring(loop, x):
+		return np.column_stack((np.full(count, x), loop[:,0], loop[:,1]))
+
+	outer0, outer1, inner0, inner1 = ring(outer, 0), ring(outer, length), ring(inner, 0), ring(inner, length)
+
+	# each quad split in two, wound counter clockwise seen from outside the solid
+	triangles = [
+		(outer0, outer0[following], outer1[following]), (outer0, outer1[following], outer1),  # outer wall
+		(inner0, inner1[following], inner0[following]), (inner0, inner1, inner1[following]),  # inner wall
+		(outer1, outer1[following], inner1[following]), (outer1, inner1[following], inner1),  # far end
+		(outer0, inner0[following], outer0[following]), (outer0, inner0, inner0[following]),  # near end
+	]
+
+	return np.concatenate([np.stack(triangle, axis=1) for triangle in triangles])
+
+# write triangles as a binary stl file, returning the bytes written
+@timed
+def write_binary_stl(stl_file, triangles):
+
+	triangles = np.asarray(triangles, dtype=np.float64)
+
+	normals = np.cross(triangles[:,1] - triangles[:,0], triangles[:,2] - triangles[:,0])
+	lengths = np.linalg.norm(normals, axis=1)
+	normals /= np.where(lengths == 0, 1, lengths)[:,None]
+
+	records = np.zeros(len(triangles), dtype=[('normal', '<f4', 3), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+	records['normal'] = normals
+	records['vertices'] = triangles
+
+	# write next to the stl and swap it in, so a viewer never loads a partly written file
+	temp_file = stl_file + '.' + str(os.getpid()) + '.tmp'
+	with open(temp_file, 'wb') as stl:
+		stl.write(b'TubeGen'.ljust(80, b' '))
+		stl.write(np.uint32(len(records)).tobytes())
+		stl.write(records.tobytes())
+	os.replace(temp_file, stl_file)
+	record_first_byte()
+
+	return 84 + records.nbytes
+
+# triangles of plain round or rectangular stock with square ends and no features, None for anything that needs modeling
+@timed
+def plain_stock_mesh(parameters, features):
+
+	if features or parameters['e1angle'] != 90 or parameters['e2angle'] != 90:
+		return None
+
+	material_type = parameters['material_type']
+	wall = parameters['wall']
+
+	if material_type == 1 and 'False' not in (parameters['e1flat'], parameters['e2flat']):  # round, without copes
+		radius = parameters['diameter'] / 2
+		segments = max(arc_segments(radius, 2 * math.pi), 3)
+		outer = circle_loop(radius, segments)
+		inner = circle_loop(radius - wall, segments)
+
+	elif material_type == 2:  # rectangular
+		outer_x = 0.5 * parameters['side2']
+		outer_y = 0.5 * parameters['side1']
+		cradius = parameters['cradius']
+		segments = arc_segments(cradius, math.pi / 2)
+		outer = rounded_rectangle_loop(outer_x, outer_y, cradius, segments)
+		inner = rounded_rectangle_loop(outer_x - wall, outer_y - wall, cradius, segments)
+
+	else:
+		return None
+
+	return extrude_loops(outer, inner, parameters['length'])
+
+# triangles of a shape, tessellated to a linear deflection in mm and angular deflection in degrees
+def tessellate_shape(shape, linear, angular):
+
+	global MeshPart
+
+	# only pieces modeled in FreeCAD are tessellated, so the mesher is loaded with the first of them
+	if MeshPart is None:
+		import MeshPart
+
+	mesh = MeshPart.meshFromShape(Shape=shape, LinearDeflection=linear, AngularDeflection=math.radians(angular), Relative=False)
+	points, facets = mesh.Topology
+	points = np.array([(point.x, point.y, point.z) for point in points])
+
+	return points[np.array(facets, dtype=np.int64).reshape(-1, 3)]
+
+# triangles of the objects' shapes, tessellated to the export deflection
+@timed
+def tessellate(objects):
+
+	triangles = []
+	for obj in objects:
+		shape = obj.Shape.copy()
+		shape.Placement = obj.getGlobalPlacement()
+		triangles.append(tessellate_shape(shape, linear_deflection, angular_deflection))
+
+	return np.concatenate(triangles)
+
+# write the bare stock of round or rectangular tube as a preview, returning False for other stock
+@timed
+def write_stock_preview(parameters, stl_file):
+
+	triangles = plain_stock_mesh(dict(parameters, e1angle=90, e2angle=90, e1flat='True', e2flat='True'), [])
+	if triangles is None:
+		return False
+
+	write_binary_stl(stl_file, triangles)
+
+	return True
 
 
 '''PARAMETER IMPORT'''
+# read a piece csv in one pass, returning its parameters and features
+def read_piece(csv_file):
+
+	with open(csv_file, newline='') as csvfile:
+		return parse_piece(csv.reader(csvfile))
+
+# parse the rows of one piece: a title row, the parameter row, the feature header row, then a row per feature
+@timed
+def parse_piece(rows):
+
+	rows = iter(rows)
+
+	next(rows, None)  # title
+	parameters = parse_parameters(next(rows, []))
+
+	# a piece without a feature header row, or with an empty one, has no features
+	header = next(rows, [])
+	if not any(field.strip() for field in header):
+		return parameters, []
+	feature_data_indexes = feature_columns(header)
+
+	# store lists with each feature data
+	feature_list = []
+	for row in rows:
+		if row:
+			feature_list.append(parse_feature(row, feature_data_indexes, parameters['material_type']))
+
+	return parameters, feature_list
+
+# piece parameters from the parameter row, converted to mm and with the rotation offset normalized
+def parse_parameters(row):
+
+	if len(row) < 48:
+		raise ValueError('piece parameter row has {} columns, expected 48'.format(len(row)))
+
+	parameters = {
+		'material_type': int(row[2]),
+		'diameter': float(row[5]) * 25.4,
+		'wall': float(row[6]) * 25.4,
+		'roffset': float(row[7]),
+		'length': float(row[8]) * 25.4,
+		'e1join': float(row[9]) * 25.4,
+		'e1angle': float(row[10]),
+		'e2join': float(row[12]) * 25.4,
+		'e2angle': float(row[13]),
+		'e1flat': str(row[27]).strip(),
+		'e2flat': str(row[28]).strip(),
+		'side1': float(row[43]) * 25.4,
+		'side2': float(row[44]) * 25.4,
+		'cradius': float(row[45]) * 25.4,
+		'e1cutside': int(row[46]),
+		'e2cutside': int(row[47]),
+	}
+
+	# PieceMaker gives one thickness, catalog I-beams replace it with separate flange and web thicknesses
+	parameters['flange'] = parameters['wall']
+
+	# a stock designation after PieceMaker's columns takes the material type and dimensions from the catalog
+	designation = row[48].strip() if len(row) > 48 else ''
+	if designation:
+		catalog_stock(designation, parameters)
+	parameters['stock'] = designation or match_stock(parameters)
+
+	# rectangular tube is rotated the opposite way to PieceMaker, swap 90 and 270
+	if parameters['material_type'] == 2:
+		if parameters['roffset'] == 90:
+			parameters['roffset'] = 270
+		elif parameters['roffset'] == 270:
+			parameters['roffset'] = 90
+
+	return parameters
+
 # import parameters from csv and run tube generation
 def import_parameters(csv_file):
 
-	# read in parameters
-	with open(csv_file) as csvfile:
-		csv_reader = csv.reader(csvfile)
-		row_count = 0
-
-		for row in csv_reader:
-			if row_count == 1:
-				material_type = int(row[2])
-				diameter = float(row[5]) * 25.4
-				wall = float(row[6]) * 25.4
-				roffset = float(row[7])
-				length = float(row[8]) * 25.4
-				e1join = float(row[9]) * 25.4
-				e1angle = float(row[10])
-				e2join = float(row[12]) * 25.4
-				e2angle = float(row[13])
-				e1flat = str(row[27]).strip()
-				e2flat = str(row[28]).strip()
-				side1 = float(row[43]) * 25.4
-				side2 = float(row[44]) * 25.4
-				cradius = float(row[45]) * 25.4
-				e1cutside = int(row[46])
-				e2cutside = int(row[47])
-			row_count += 1
+	return build_tube(read_piece(csv_file)[0])
+
+# run tube generation from piece parameters
+@timed
+def build_tube(parameters):
+
+	global current_stock
+
+	material_type = parameters['material_type']
+	diameter = parameters['diameter']
+	wall = parameters['wall']
+	roffset = parameters['roffset']
+	length = parameters['length']
+	e1join = parameters['e1join']
+	e1angle = parameters['e1angle']
+	e2join = parameters['e2join']
+	e2angle = parameters['e2angle']
+	e1flat = parameters['e1flat']
+	e2flat = parameters['e2flat']
+	side1 = parameters['side1']
+	side2 = parameters['side2']
+	cradius = parameters['cradius']
+	e1cutside = parameters['e1cutside']
+	e2cutside = parameters['e2cutside']
+	flange = parameters.get('flange', wall)
+
+	# catalog stock starts from its saved cross-section
+	current_stock = parameters.get('stock')
+
+	load_freecad()
 
 	# initialize length used for calculating feature location, default is 'length', which is only used for round
 	feat_length = length
@@ -100,10 +1131,6 @@ def import_parameters(csv_file):
 		round_tube(diameter, wall, length, roffset, e1angle, e2angle, e1flat, e2flat, e1join, e2join)
 
 	elif material_type == 2:  # rectangular
-		if roffset == 90:
-			roffset = 270
-		elif roffset == 270:
-			roffset = 90
 		rectangular_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle, e1cutside, e2cutside)
 
 	elif material_type == 3:  # angle iron
@@ -116,114 +1143,590 @@ def import_parameters(csv_file):
 		c_channel_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle, e1cutside, e2cutside)
 
 	elif material_type == 6:  # flat bar
-		i_beam_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle, e1cutside, e2cutside)
+		i_beam_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle, e1cutside, e2cutside, flange)
 
 	# return length for features, and material_type
 	return feat_length, material_type
 
-# import features from csv and run feature generation
-def import_features(csv_file, feat_length, material_type):
-
-	# import feature data
-	with open(csv_file) as csvfile:
-		csv_reader = csv.reader(csvfile)
-		line_count = 0
-
-		# header data from the csv to be read (UPDATE IF DIFFERENT FEATURE INFO IS NEEDED)
-		feature_data_needed = ['DescType', 'XDistance', 'ROS', 'Diameter', 'Seperation', 'XDistance_Y', 'ArrayIncrement', 'ArrayInstances', 'Orientation_0', 'Orientation_90', 'Orientation_180', 'Orientation_270', 'ArrayIncrement_Y', 'ArrayInstances_Y', 'ArrayIncrement_A', 'ArrayInstances_A']
+# header data from the csv to be read (UPDATE IF DIFFERENT FEATURE INFO IS NEEDED)
+feature_data_needed = ['DescType', 'XDistance', 'ROS', 'Diameter', 'Seperation', 'XDistance_Y', 'ArrayIncrement', 'ArrayInstances', 'Orientation_0', 'Orientation_90', 'Orientation_180', 'Orientation_270', 'ArrayIncrement_Y', 'ArrayInstances_Y', 'ArrayIncrement_A', 'ArrayInstances_A']
 
-		# store lists with each feature data
-		feature_list = []
+# indexes of each necessary piece of feature data in the feature header row
+def feature_columns(row):
 
-		# read through each row of csv file
-		for row in csv_reader:
-			if line_count == 2:  # feature headers
+	missing = [header for header in feature_data_needed if header not in row]
+	if missing:
+		raise ValueError('feature header row is missing ' + ', '.join(missing))
 
-				feature_data_indexes = []
+	return [row.index(header) for header in feature_data_needed]
 
-				# save the indexes of each necessary piece of data in a list
-				for header in feature_data_needed:
-					feature_data_indexes.append(row.index(header))
+# feature data from a feature row, with orientations adjusted for the material type
+def parse_feature(row, feature_data_indexes, material_type):
 
-			elif line_count >= 3:  # feature data
+	feature_data = [float(row[i]) for i in feature_data_indexes]
 
-				# temporary storage for feature data
-				feature_data = []
+	# c-channel, circles, slots and rectangles cut at 0 need to be swapped with 270
+	if material_type == 5 and feature_data[0] in (0, 1, 4):
+		feature_data[9], feature_data[11] = feature_data[11], feature_data[9]
 
-				# add necessary data to list
-				for i in feature_data_indexes:
-					feature_data.append(float(row[i]))
+	return feature_data
 
-				if material_type == 5:  # c-channel, rotate feature degrees by 90, counter clockwise
-#					feature_temp = feature_data[11]
-#					feature_data[11] = feature_data[10]
-#					feature_data[10] = feature_data[9]
-#					feature_data[9] = feature_data[8]
-#					feature_data[8] = feature_temp
-
-					if feature_data[0] == 0:  # circle - 0 needs to be swapped with 270
-						feature_temp = feature_data[9]
-						feature_data[9] = feature_data[11]
-						feature_data[11] = feature_temp
-					if feature_data[0] == 1:  # slot - 0 needs to be swapped with 270
-						feature_temp = feature_data[9]
-						feature_data[9] = feature_data[11]
-						feature_data[11] = feature_temp
-					if feature_data[0] == 4:  # rectangle - 0 needs to be swapped with 270
-						feature_temp = feature_data[9]
-						feature_data[9] = feature_data[11]
-						feature_data[11] = feature_temp
+# import features from csv and run feature generation
+def import_features(csv_file, feat_length, material_type):
 
-				# add list for each feature to collective list
-				feature_list.append(feature_data)
+	build_features(read_piece(csv_file)[1], feat_length, material_type)
 
-			line_count += 1
+# run feature generation from the features read from csv
+@timed
+def build_features(feature_list, feat_length, material_type):
 
-	# using DescType, generate appropriate features with defined parameters
+	# using DescType, list the features to be generated
 	for feature in feature_list:
 		if feature[0] == 0:  # circle
 			print('Circle Feature: ', feature)
-			# print (str(feature[13])+ ": " + str(feature[13]) +": " + str(feature[14])+": " + str(feature[15]))
-			for i in range(0, int(feature[13])):
-				# print (str(i) + ": " + str(feature[13]))
-				print (feature)
-				circle_feature(feature[1] * 25.4, feature[2], feature[3] * 25.4, (feature[5] + i*feature[12]) * 25.4, feature[6] * 25.4, int(feature[7]), feat_length, material_type, bool(int(feature[8])), bool(int(feature[11])), bool(int(feature[10])), bool(int(feature[9])))
 		elif feature[0] == 1:  # slot
 			print('Slot Feature: ', feature)
-			# print (str(feature[13])+ ": " + str(feature[13]) +": " + str(feature[14])+": " + str(feature[15]))
-			for i in range(0, int(feature[13])):
-				# print (str(i) + ": " + str(feature[13]))
-				slot_feature(feature[1] * 25.4, feature[2], feature[3] * 25.4, feature[4] * 25.4, (feature[5] + i*feature[12]) * 25.4, feature[6] * 25.4, int(feature[7]), feat_length, material_type, bool(int(feature[8])), bool(int(feature[9])), bool(int(feature[10])), bool(int(feature[11])))
 		elif feature[0] == 4:  # rectangle
 			print('Rectangle Feature: ', feature)
-			# print (str(feature[13])+ ": " + str(feature[13]) +": " + str(feature[14])+": " + str(feature[15]))
-			for i in range(0, int(feature[13])):
-				# print (str(i) + ": " + str(feature[13]))
-				rectangle_feature(feature[1] * 25.4, feature[2], feature[3] * 25.4, feature[4] * 25.4, (feature[5] + i*feature[12]) * 25.4, feature[6] * 25.4, int(feature[7]), feat_length, material_type, bool(int(feature[8])), bool(int(feature[9])), bool(int(feature[10])), bool(int(feature[11])))
 		else:  # undefined
 			print('Undefined Feature: ', feature)
 
+	# expand the feature arrays into cuts, then sketch and pocket them
+	cut_features(plan_features(feature_list, feat_length, material_type), material_type)
+
+
+'''MODELING'''
+# modeling engine, 'partdesign' builds the parametric Body tree, 'direct' cuts Part shapes without sketches or a Body
+engine = os.environ.get('TUBEGEN_ENGINE', 'partdesign')
+
+# 'each' recomputes the document after every feature, 'deferred' builds the whole Body tree and recomputes it once before export
+recompute_mode = os.environ.get('TUBEGEN_RECOMPUTE', 'each')
+
+# threads OpenCASCADE's booleans may run on, 0 for every processor, unset leaves FreeCAD's defaults
+parallel_threads = os.environ.get('TUBEGEN_PARALLEL')
+
+# fuzzy tolerance in mm, the direct engine's booleans treat faces closer than this as touching, 0 for exact booleans
+# direct engine only, PartDesign pockets have no fuzzy value and always cut exactly
+fuzzy_tolerance = float(os.environ.get('TUBEGEN_FUZZY', '0'))
+
+# 'each' cuts the direct engine's solid as every pocket is made, 'single' collects every tool and cuts them all in one boolean
+# parallel booleans default to 'single', per pocket cuts are too small to share between threads
+cut_mode = os.environ.get('TUBEGEN_CUT', 'each' if parallel_threads is None else 'single')
+
+# axis the tube is extruded along, before the body is rotated into the PieceMaker window, set once FreeCAD is loaded
+tube_axis = None
+
+# folder of FreeCAD's python modules, only needed to run under plain python when FreeCAD is not on its path
+freecad_lib = os.environ.get('TUBEGEN_FREECAD_LIB')
+
+# solid being built by the direct engine, and the placement it is rendered at
+direct_solid = None
+direct_placement = None
+
+# tools waiting to be cut from the direct engine's solid in one boolean
+direct_tools = []
+
+# import the FreeCAD modules the selected engine models with, the first time a piece is modeled
+@timed
+def load_freecad():
+
+	global FreeCAD, App, Part, Sketcher, PartDesign, tube_axis
+
+	if FreeCAD is None:
+		if freecad_lib and freecad_lib not in sys.path:
+			sys.path.append(freecad_lib)
+		import FreeCAD
+		App = FreeCAD
+
+	# the direct engine builds sketch geometry and constraints as well, only the Body needs PartDesign
+	if Part is None:
+		import Part, Sketcher
+		tube_axis = App.Vector(0,1,0)
+		configure_booleans()
+	if PartDesign is None and engine != 'direct':
+		import PartDesign
+
+# limit the processors OpenCASCADE's booleans run on to parallel_threads, each parallel worker on its own processors
+def configure_booleans():
+
+	if fuzzy_tolerance and engine != 'direct':
+		print('Warning: TUBEGEN_FUZZY only applies to the direct engine, PartDesign pockets cut exactly')
+
+	if parallel_threads is None or int(parallel_threads) <= 0:
+		return
+
+	# FreeCAD runs its booleans in OpenCASCADE's parallel mode, but its python api has no setting for their thread count.
+	# OpenCASCADE sizes its thread pool from the processors the process may run on, so restricting them caps its threads.
+	# The limit holds for the whole FreeCAD process, which headless spends most of its time in booleans
+	if not hasattr(os, 'sched_setaffinity'):
+		print('Warning: TUBEGEN_PARALLEL has no effect on this platform, booleans use every processor')
+		return
+
+	threads = int(parallel_threads)
+	processors = sorted(os.sched_getaffinity(0))
+
+	# worker n takes the n-th slice of threads processors, wrapping round once every processor is taken
+	first = int(os.environ.get('TUBEGEN_WORKER_NUMBER', '0')) * threads
+	os.sched_setaffinity(0, {processors[(first + offset) % len(processors)] for offset in range(min(threads, len(processors)))})
+
+# names of the open documents, none before FreeCAD is loaded
+def document_names():
+
+	return set(App.listDocuments()) if App else set()
+
+# sketch stand-in for the direct engine, geometry is kept in sketch coordinates with the sketch's global placement
+class DirectSketch:
+
+	def __init__(self, placement):
+		self.Placement = placement
+		self.Geometry = []
+
+	def addGeometry(self, geometry, construction=False):
+		if isinstance(geometry, list):
+			self.Geometry.extend(geometry)
+		else:
+			self.Geometry.append(geometry)
+
+	# geometry is placed exactly, there is nothing to solve
+	def addConstraint(self, constraints):
+		pass
+
+# recompute the document after a feature, unless recomputes are deferred to export, where it is recomputed once with deferred
+@timed
+def recompute(deferred=False):
+
+	# the direct engine's shapes are up to date as soon as they are cut
+	if engine == 'direct' or (recompute_mode == 'deferred') != deferred:
+		return
+
+	App.ActiveDocument.recompute()
+
+# placement of a Body origin plane
+def origin_plane(name):
+
+	if name == 'XZ_Plane':
+		return App.Placement(App.Vector(0,0,0), App.Rotation(App.Vector(1,0,0), 90))
+	elif name == 'YZ_Plane':
+		return App.Placement(App.Vector(0,0,0), App.Rotation(App.Vector(1,1,1), 120))
+
+	return App.Placement()  # XY_Plane
+
+# create a new document, with a PartDesign body for the partdesign engine
+@timed
+def new_body(name):
+
+	global direct_solid, direct_placement, direct_tools
+
+	App.newDocument(name)
+
+	if engine == 'direct':
+		direct_solid = None
+		direct_placement = App.Placement()
+		direct_tools = []
+	else:
+		App.activeDocument().addObject('PartDesign::Body','Body')
+
+# create a datum plane at placement to attach sketches to
+def new_datum_plane(name, placement):
+
+	if engine == 'direct':
+		return placement
+
+	datum_plane = App.activeDocument().Body.newObject('PartDesign::Plane', name)
+	datum_plane.Placement = placement
+
+	return datum_plane
+
+# create a sketch on an origin plane or datum plane, optionally offset from it
+@timed
+def new_sketch(name, support, offset=None):
+
+	if engine == 'direct':
+		placement = origin_plane(support) if isinstance(support, str) else support
+		if offset is not None:
+			placement = placement.multiply(offset)
+		return DirectSketch(placement)
+
+	sketch = App.activeDocument().Body.newObject('Sketcher::SketchObject', name)
+	sketch.Support = (App.activeDocument().getObject(support) if isinstance(support, str) else support, [''])
+	sketch.MapMode = 'FlatFace'
+	if offset is not None:
+		sketch.AttachmentOffset = offset
+
+	return sketch
+
+# geometry of a rectangle centred on the sketch origin, corners filleted to radius the way Sketch.fillet leaves them
+@timed
+def rounded_rectangle(half_x, half_y, radius):
+
+	corners = [(-half_x,-half_y), (half_x,-half_y), (half_x,half_y), (-half_x,half_y)]  # counter clockwise from bottom left
+
+	geoList = []
+	for corner in range(4):
+		start_x, start_y = corners[corner]
+		end_x, end_y = corners[(corner + 1) % 4]
+
+		# straight edge, shortened by the fillet at each end
+		step_x = radius * ((end_x > start_x) - (end_x < start_x))
+		step_y = radius * ((end_y > start_y) - (end_y < start_y))
+		if abs(end_x - start_x) + abs(end_y - start_y) > 2 * radius:
+			geoList.append(Part.LineSegment(App.Vector(start_x + step_x,start_y + step_y,0),App.Vector(end_x - step_x,end_y - step_y,0)))
+
+		# fillet at the end corner
+		if radius != 0:
+			center_x = end_x - radius * ((end_x > 0) - (end_x < 0))
+			center_y = end_y - radius * ((end_y > 0) - (end_y < 0))
+			start_angle = (corner - 1) * math.pi / 2
+			geoList.append(Part.ArcOfCircle(Part.Circle(App.Vector(center_x,center_y,0),App.Vector(0,0,1),radius),start_angle,start_angle + math.pi / 2))
+
+	return geoList
+
+# geometry of a closed outline through corner points counter clockwise, each corner filleted to its radius, 0 leaves it sharp
+@timed
+def closed_profile(points, radii):
+
+	count = len(points)
+
+	# unit direction of the edge leaving each corner
+	directions = []
+	for corner in range(count):
+		start_x, start_y = points[corner]
+		end_x, end_y = points[(corner + 1) % count]
+		edge_length = math.hypot(end_x - start_x, end_y - start_y)
+		directions.append(((end_x - start_x) / edge_length, (end_y - start_y) / edge_length, edge_length))
+
+	geoList = []
+	for corner in range(count):
+		corner_x, corner_y = points[corner]
+		out_x, out_y, edge_length = directions[corner]
+		in_x, in_y, _ = directions[corner - 1]
+		radius = radii[corner]
+
+		# fillet at the corner, from the end of the incoming edge to the start of the outgoing one
+		if radius != 0:
+			center = App.Vector(corner_x + radius * (out_x - in_x),corner_y + radius * (out_y - in_y),0)
+			start_angle = math.atan2(-out_y, -out_x)
+			end_angle = math.atan2(in_y, in_x)
+			if in_x * out_y - in_y * out_x < 0:  # concave corner, the arc runs the other way round
+				start_angle, end_angle = end_angle, start_angle
+			if end_angle < start_angle:
+				end_angle += 2 * math.pi
+			geoList.append(Part.ArcOfCircle(Part.Circle(center,App.Vector(0,0,1),radius),start_angle,end_angle))
+
+		# straight edge to the next corner, shortened by the fillet at each end
+		next_x, next_y = points[(corner + 1) % count]
+		next_radius = radii[(corner + 1) % count]
+		if edge_length > radius + next_radius:
+			geoList.append(Part.LineSegment(App.Vector(corner_x + radius * out_x,corner_y + radius * out_y,0),App.Vector(next_x - next_radius * out_x,next_y - next_radius * out_y,0)))
+
+	return geoList
+
+# planar face bounded by a sketch's closed wires, in global coordinates
+@timed
+def sketch_face(sketch):
+
+	if engine == 'direct':
+		edges = Part.Compound([geometry.toShape() for geometry in sketch.Geometry])
+		face = Part.makeFace(edges.connectEdgesToWires(False).Wires, 'Part::FaceMakerBullseye')
+		face.Placement = sketch.Placement
+		return face
+
+	return Part.makeFace(sketch.Shape.Wires, 'Part::FaceMakerBullseye')
+
+# normal of a sketch, the direction pads extrude in
+def sketch_normal(sketch):
+
+	if engine == 'direct':
+		return sketch.Placement.Rotation.multVec(App.Vector(0,0,1))
+
+	return sketch.getGlobalPlacement().Rotation.multVec(App.Vector(0,0,1))
+
+# boss extrude a sketch along its normal
+@timed
+def pad(name, sketch, length):
+
+	global direct_solid
+
+	if engine == 'direct':
+		direct_solid = sketch_face(sketch).extrude(sketch_normal(sketch) * length)
+		return direct_solid
+
+	feature = App.activeDocument().Body.newObject('PartDesign::Pad', name)
+	feature.Profile = sketch
+	feature.Length = length
+
+	return feature
+
+# extrude cut a sketch, pocket_type 4 cuts length into the material and length2 out of it, 1 cuts through all on one side
+# linear repeats the cut as (occurrences, mm between them) along the tube axis and polar as (occurrences, degrees between them) about it
+@timed
+def pocket(name, sketch, length, length2, pocket_type=4, reversed=False, linear=None, polar=None):
+
+	if engine == 'direct':
+
+		# empty sketches leave the solid as it is
+		if len(sketch.Geometry) == 0:
+			return direct_solid
+
+		face = sketch_face(sketch)
+		normal = sketch_normal(sketch)
+
+		# lengths past the far side of the solid cut nothing more, so clamp them to keep the tool small
+		bound_box = direct_solid.BoundBox
+		reach = (bound_box.Center - sketch.Placement.Base).Length + bound_box.DiagonalLength
+
+		if pocket_type == 1:  # through all, against the normal unless reversed
+			start, end = (0, reach) if reversed else (-reach, 0)
+		elif reversed:  # two lengths, flipped
+			start, end = -min(length2, reach), min(length, reach)
+		else:  # two lengths
+			start, end = -min(length, reach), min(length2, reach)
+
+		face.translate(normal * start)
+		tools = pattern_tools(face.extrude(normal * (end - start)), linear, polar)
+
+		# every copy of a patterned tool is cut in the same boolean, and with cut_mode 'single' every other pocket's tools as well
+		if cut_mode == 'single':
+			direct_tools.extend(tools)
+		else:
+			boolean_cut(tools)
+
+		return direct_solid
+
+	feature = App.activeDocument().Body.newObject('PartDesign::Pocket', name)
+	feature.Profile = sketch
+	feature.Length = length
+	feature.Length2 = length2
+	feature.Type = pocket_type
+	feature.Reversed = reversed
+
+	if linear is not None or polar is not None:
+		return pattern_feature(name + 'Pattern', feature, linear, polar)
+
+	return feature
+
+# cut tools from the direct engine's solid in one boolean, timed apart from building them
+@timed
+def boolean_cut(tools):
+
+	global direct_solid
+
+	tool = tools if len(tools) > 1 else tools[0]
+
+	if fuzzy_tolerance:
+		direct_solid = direct_solid.cut(tool, fuzzy_tolerance)
+	else:
+		direct_solid = direct_solid.cut(tool)
+
+# cut the tools collected so far, before the direct engine's solid is used
+def cut_pending_tools():
+
+	global direct_tools
+
+	if direct_tools:
+		boolean_cut(direct_tools)
+		direct_tools = []
+
+# copies of a direct engine tool, translated along the tube axis and then rotated about it
+def pattern_tools(tool, linear=None, polar=None):
+
+	tools = [tool]
+
+	if linear is not None:
+		occurrences, spacing = linear
+		tools = [copied.translated(tube_axis * (occurrence * spacing)) for copied in tools for occurrence in range(occurrences)]
+
+	if polar is not None:
+		occurrences, angle = polar
+		rotated = []
+		for copied in tools:
+			for occurrence in range(occurrences):
+				rotated_tool = copied.copy()
+				rotated_tool.rotate(App.Vector(0,0,0), tube_axis, occurrence * angle)
+				rotated.append(rotated_tool)
+		tools = rotated
+
+	return tools
+
+# repeat a feature along the tube axis and about it, with one pattern, or a MultiTransform of both
+def pattern_feature(name, feature, linear=None, polar=None):
+
+	document = App.activeDocument()
+	axis = (document.getObject('Y_Axis'), [''])
+	transformations = []
+
+	# the patterns of a MultiTransform belong to it rather than to the body
+	multi_transform = linear is not None and polar is not None
+	def new_pattern(type_name, pattern_name):
+		if multi_transform:
+			return document.addObject(type_name, pattern_name)
+		return document.Body.newObject(type_name, pattern_name)
+
+	if linear is not None:
+		occurrences, spacing = linear
+		linear_pattern = new_pattern('PartDesign::LinearPattern', name + 'Linear')
+		linear_pattern.Direction = axis
+		linear_pattern.Reversed = spacing < 0
+		linear_pattern.Length = (occurrences - 1) * abs(spacing)
+		linear_pattern.Occurrences = occurrences
+		transformations.append(linear_pattern)
+
+	if polar is not None:
+		occurrences, angle = polar
+
+		# a pattern spans Angle, spreading the occurrences evenly when it goes all the way round
+		polar_pattern = new_pattern('PartDesign::PolarPattern', name + 'Polar')
+		polar_pattern.Axis = axis
+		polar_pattern.Reversed = angle < 0
+		polar_pattern.Occurrences = occurrences
+		step = abs(angle)
+		if abs(occurrences * step - 360) < 1e-6:
+			polar_pattern.Angle = 360
+		elif (occurrences - 1) * step < 360:
+			polar_pattern.Angle = (occurrences - 1) * step
+		elif 'Spacing' in getattr(polar_pattern, 'getEnumerationsOfProperty', lambda name: [])('Mode'):
+			# past a full turn the span cannot hold the copies, newer FreeCAD spaces them by Offset instead
+			polar_pattern.Mode = 'Spacing'
+			polar_pattern.Offset = step
+		else:
+			raise ValueError('a polar pattern of {} holes {} degrees apart wraps past a full turn, use TUBEGEN_ENGINE=direct with this FreeCAD'.format(occurrences, step))
+		transformations.append(polar_pattern)
+
+	if multi_transform:
+		pattern = document.Body.newObject('PartDesign::MultiTransform', name)
+		pattern.Transformations = transformations
+	else:
+		pattern = transformations[0]
+
+	pattern.Originals = [feature]
+
+	return pattern
+
+# place the finished body and queue it for rendering
+def finish_body(placement):
+
+	global __objs__, direct_placement
+
+	if engine == 'direct':
+		direct_placement = placement
+		__objs__ = []
+		return
+
+	App.ActiveDocument.Body.Placement = placement
+
+	__objs__ = [App.ActiveDocument.Body]
+
+# shape of the piece modeled so far, placed as it will be exported
+def current_shape():
+
+	if engine == 'direct':
+		cut_pending_tools()
+		shape = direct_solid.copy()
+		shape.Placement = direct_placement
+		return shape
+
+	recompute(deferred=True)
+
+	shape = App.ActiveDocument.Body.Shape.copy()
+	shape.Placement = App.ActiveDocument.Body.getGlobalPlacement()
+
+	return shape
+
+# objects to export, the direct engine's solid is added to the document once all cuts are done
+@timed
+def export_objects():
+
+	if engine == 'direct':
+		cut_pending_tools()
+		body = App.ActiveDocument.addObject('Part::Feature', 'Body')
+		body.Shape = direct_solid
+		body.Placement = direct_placement
+		return [body]
+
+	recompute(deferred=True)
+
+	return __objs__
+
+# close the documents opened since open_documents and drop every reference to the piece's objects and shapes
+def release_piece(open_documents):
+
+	global __objs__, direct_solid, direct_placement, direct_tools, sketch_counter
+
+	# the generators look their documents up by name, so they are closed rather than reused
+	for name in document_names() - open_documents:
+		App.closeDocument(name)
+
+	__objs__ = []
+	direct_solid = None
+	direct_placement = None
+	direct_tools = []
+
+	# feature names restart with each piece
+	sketch_counter = 0
+
+# build a piece once for each value of a modeling setting and print how far apart the solids and times are
+def compare_settings(csv_file, setting, values):
+
+	parameters, features = read_piece(csv_file)
+
+	original = globals()[setting]
+
+	shapes = []
+	for value in values:
+		globals()[setting] = value
+		profile_cache.clear()  # time each build from its own sketches
+
+		start = time.perf_counter()
+		feat_length, material_type = build_tube(parameters)
+		build_features(features, feat_length, material_type)
+		body = export_objects()[0]
+		seconds = time.perf_counter() - start
+
+		shape = body.Shape.copy()
+		shape.Placement = body.getGlobalPlacement()
+		shapes.append(shape)
+
+		bound_box = shape.BoundBox
+		print('Compare: {}={} {:.3f} s, volume {:.3f}, area {:.3f}, bounds {:.3f} x {:.3f} x {:.3f}'.format(setting, value, seconds, shape.Volume, shape.Area, bound_box.XLength, bound_box.YLength, bound_box.ZLength))
+
+		App.closeDocument(App.ActiveDocument.Name)
+
+	globals()[setting] = original
+
+	# volume in one solid but not the other, zero when the builds agree
+	difference = shapes[0].cut(shapes[-1]).Volume + shapes[-1].cut(shapes[0]).Volume
+	print('Compare: difference volume {:.6f}'.format(difference))
+
+	return difference
+
+# build a piece with both engines
+def compare_engines(csv_file):
+	return compare_settings(csv_file, 'engine', ('partdesign', 'direct'))
+
+# build a piece recomputing after every feature, then recomputing once before export
+def compare_recompute(csv_file):
+	return compare_settings(csv_file, 'recompute_mode', ('each', 'deferred'))
+
+# build a piece with the direct engine cutting each pocket, then every tool in one boolean
+def compare_cut(csv_file):
+
+	global engine
+
+	original = engine
+	engine = 'direct'
+
+	try:
+		return compare_settings(csv_file, 'cut_mode', ('each', 'single'))
+	finally:
+		engine = original
+
 
 '''TUBE GENERATION'''
 # generate round tube STL file
 def round_tube(diameter, wall, length, roffset, e1angle, e2angle, e1flat, e2flat, e1join, e2join):
 
 	# create new part with the PartDesign workbench
-	App.newDocument("RoundTube")
-	App.activeDocument().addObject('PartDesign::Body','Body')
-
-	# create sketch on the front plane
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch')
-	App.activeDocument().Sketch.Support = (App.activeDocument().XZ_Plane, [''])
-	App.activeDocument().Sketch.MapMode = 'FlatFace'
-
-	# calculate position of inner circle
-	radius = diameter / 2
-	inner_radius = radius - wall
-
-	# sketch outer and inner circles
-	App.ActiveDocument.Sketch.addGeometry(Part.Circle(App.Vector(0,0,0),App.Vector(0,0,1),radius),False)
-	App.ActiveDocument.Sketch.addGeometry(Part.Circle(App.Vector(0,0,0),App.Vector(0,0,1),inner_radius),False)
+	new_body("RoundTube")
 
 	# consider end cuts (center-to-center) in length calculation NEEDS WORK
 	if e1angle == 90 and e1flat=='True':
@@ -243,11 +1746,27 @@ def round_tube(diameter, wall, length, roffset, e1angle, e2angle, e1flat, e2flat
 	else:
 		length = length +  (diameter * math.tan(math.radians(90 - e1angle)) / 2) + (diameter * math.tan(math.radians(90 - e2angle)) / 2)
 
-	# boss extrude the sketch
-	App.activeDocument().Body.newObject("PartDesign::Pad","Pad")
-	App.activeDocument().Pad.Profile = App.activeDocument().Sketch
-	App.ActiveDocument.Pad.Length = length
-	App.ActiveDocument.recompute()
+	# reuse the cross-section of this stock if it has already been sketched
+	profile_key = ('RoundTube', diameter, wall)
+	if not cached_profile(profile_key, length):
+
+		# create sketch on the front plane
+		sketch = new_sketch('Sketch', 'XZ_Plane')
+
+		# calculate position of inner circle
+		radius = diameter / 2
+		inner_radius = radius - wall
+
+		# sketch outer and inner circles
+		sketch.addGeometry(Part.Circle(App.Vector(0,0,0),App.Vector(0,0,1),radius),False)
+		sketch.addGeometry(Part.Circle(App.Vector(0,0,0),App.Vector(0,0,1),inner_radius),False)
+
+		# boss extrude the sketch
+		pad('Pad', sketch, length)
+		recompute()
+
+		# remember the cross-section for the next piece of this stock
+		store_profile(profile_key, sketch)
 
 	# determine location of end cuts
 	y = diameter / 2
@@ -268,111 +1787,73 @@ def round_tube(diameter, wall, length, roffset, e1angle, e2angle, e1flat, e2flat
 	if e1angle != 90 and e1flat == 'True':  # angled flat cut
 
 		# create sketch for first end cut (right plane)
-		App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch001')
-		App.activeDocument().Sketch001.Support = (App.activeDocument().YZ_Plane, [''])
-		App.activeDocument().Sketch001.MapMode = 'FlatFace'
+		sketch001 = new_sketch('Sketch001', 'YZ_Plane')
 
 		# sketch first end cut
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)),False)
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)),False)
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)),False)
 
 		# extrude cut the first end cut
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-		App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-		App.ActiveDocument.Pocket.Length = 1000000
-		App.ActiveDocument.Pocket.Length2 = 1000000
-		App.ActiveDocument.Pocket.Type = 4
-		App.ActiveDocument.recompute()
+		pocket('Pocket', sketch001, 1000000, 1000000)
+		recompute()
 
 	elif e1flat == 'False' and e1angle == 90:  # cope / angled cope
 
 		# adjust for cope
 		e1angle = 90 - e1angle
 
-		# create plane for sketch for first end cut (angled cope)
-		App.getDocument('RoundTube').getObject('Body').newObject('PartDesign::Plane','DatumPlane')
-
-		# position plane
-		App.getDocument("RoundTube").DatumPlane.Placement=App.Placement(App.Vector(0,-length,0), App.Rotation(App.Vector(1,0,0),-e1angle), App.Vector(0,0,0))
+		# create and position plane for sketch for first end cut (angled cope)
+		datum_plane = new_datum_plane('DatumPlane', App.Placement(App.Vector(0,-length,0), App.Rotation(App.Vector(1,0,0),-e1angle), App.Vector(0,0,0)))
 
 		# create sketch for first end cut (right plane)
-		App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch001')
-		App.activeDocument().Sketch001.Support = (App.activeDocument().DatumPlane, [''])
-		App.activeDocument().Sketch001.MapMode = 'FlatFace'
-		App.ActiveDocument.recompute()
+		sketch001 = new_sketch('Sketch001', datum_plane)
+		recompute()
 
 		# sketch angled cope
-		App.ActiveDocument.Sketch001.addGeometry(Part.Circle(App.Vector(0,0,0),App.Vector(0,0,1),e1cope_radius),False)
+		sketch001.addGeometry(Part.Circle(App.Vector(0,0,0),App.Vector(0,0,1),e1cope_radius),False)
 
 		# extrude cut the first end cut
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-		App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-		App.ActiveDocument.Pocket.Length = 1000000
-		App.ActiveDocument.Pocket.Length2 = 1000000
-		App.ActiveDocument.Pocket.Type = 4
-		App.ActiveDocument.recompute()
+		pocket('Pocket', sketch001, 1000000, 1000000)
+		recompute()
 
 	# determine if second end cut is flat, angled, or coped
 	if e2angle != 90 and e2flat == 'True':  # angled flat cut
 
-		# create sketch for second end cut (right plane)
-		App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch002')
-		App.activeDocument().Sketch002.Support = (App.activeDocument().YZ_Plane, [''])
-		App.activeDocument().Sketch002.MapMode = 'FlatFace'
-
-		# position plane and adjust for roffset
-		App.getDocument('RoundTube').getObject('Sketch002').AttachmentOffset = App.Placement(App.Vector(0,0,0),App.Rotation(App.Vector(1,0,0),-roffset))
+		# create sketch for second end cut (right plane), positioned to adjust for roffset
+		sketch002 = new_sketch('Sketch002', 'YZ_Plane', App.Placement(App.Vector(0,0,0),App.Rotation(App.Vector(1,0,0),-roffset)))
 
 		# sketch second end cut
-		App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)),False)
-		App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)),False)
-		App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
+		sketch002.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)),False)
+		sketch002.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)),False)
+		sketch002.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
 
 		# extrude cut the second end cut
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-		App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch002
-		App.ActiveDocument.Pocket001.Length = 1000000
-		App.ActiveDocument.Pocket001.Length2 = 1000000
-		App.ActiveDocument.Pocket001.Type = 4
-		App.ActiveDocument.recompute()
+		pocket('Pocket001', sketch002, 1000000, 1000000)
+		recompute()
 
 	elif e2flat == 'False' and e2angle == 90:  # cope / angled cope
 
 		# adjust for cope
 		e2angle = 90 - e2angle
 
-		# create plane for sketch for second end cut (angled cope)
-		App.getDocument('RoundTube').getObject('Body').newObject('PartDesign::Plane','DatumPlane001')
-
-		# position plane and adjust for roffset
-		App.getDocument("RoundTube").DatumPlane001.Placement=App.Placement(App.Vector(0,0,0), App.Rotation(0,-roffset,e2angle), App.Vector(0,0,0))
+		# create and position plane for sketch for second end cut (angled cope), adjusted for roffset
+		datum_plane001 = new_datum_plane('DatumPlane001', App.Placement(App.Vector(0,0,0), App.Rotation(0,-roffset,e2angle), App.Vector(0,0,0)))
 
 		# create sketch for second end cut (right plane)
-		App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch002')
-		App.activeDocument().Sketch002.Support = (App.activeDocument().DatumPlane001, [''])
-		App.activeDocument().Sketch002.MapMode = 'FlatFace'
-		App.ActiveDocument.recompute()
+		sketch002 = new_sketch('Sketch002', datum_plane001)
+		recompute()
 
 		# sketch angled cope
-		App.ActiveDocument.Sketch002.addGeometry(Part.Circle(App.Vector(0,0,0),App.Vector(0,0,1),e2cope_radius),False)
+		sketch002.addGeometry(Part.Circle(App.Vector(0,0,0),App.Vector(0,0,1),e2cope_radius),False)
 
 		# extrude cut the second end cut
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-		App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch002
-		App.ActiveDocument.Pocket001.Length = 1000000
-		App.ActiveDocument.Pocket001.Length2 = 1000000
-		App.ActiveDocument.Pocket001.Type = 4
-		App.ActiveDocument.recompute()
-
+		pocket('Pocket001', sketch002, 1000000, 1000000)
+		recompute()
 
-	# rotate tube to fit in PieceMaker viewing window
-	App.getDocument("RoundTube").Body.Placement=App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0))
 
-	# render and save STL file
-	global __objs__
-	__objs__=[]
-	__objs__.append(FreeCAD.getDocument("RoundTube").getObject("Body"))
+	# rotate tube to fit horizontally in PieceMaker window, and render
+	finish_body(App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0)))
 
 # generate rectangular tube STL file
 def rectangular_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle, e1cutside, e2cutside):
@@ -390,64 +1871,7 @@ def rectangular_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2an
 	inner_y = outer_y - wall
 
 	# create new part with the PartDesign workbench
-	App.newDocument("RectangularTube")
-	App.activeDocument().addObject('PartDesign::Body','Body')
-
-	# create sketch on the front plane
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch')
-	App.activeDocument().Sketch.Support = (App.activeDocument().XZ_Plane, [''])
-	App.activeDocument().Sketch.MapMode = 'FlatFace'
-
-	# sketch outer square
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,-outer_y,0),App.Vector(outer_x,-outer_y,0)))  # bottom edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,-outer_y,0),App.Vector(outer_x,outer_y,0)))  # right edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,outer_y,0),App.Vector(-outer_x,outer_y,0)))  # top edge
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,outer_y,0),App.Vector(-outer_x,-outer_y,0)))  # left edge
-	App.ActiveDocument.Sketch.addGeometry(geoList,False)
-
-	# constraints needed for fillet anchors
-	conList = []
-	conList.append(Sketcher.Constraint('Coincident',0,2,1,1))
-	conList.append(Sketcher.Constraint('Coincident',1,2,2,1))
-	conList.append(Sketcher.Constraint('Coincident',2,2,3,1))
-	conList.append(Sketcher.Constraint('Coincident',3,2,0,1))
-	conList.append(Sketcher.Constraint('Horizontal',0))
-	conList.append(Sketcher.Constraint('Horizontal',2))
-	conList.append(Sketcher.Constraint('Vertical',1))
-	conList.append(Sketcher.Constraint('Vertical',3))
-	App.ActiveDocument.Sketch.addConstraint(conList)
-
-	# sketch inner square
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,-inner_y,0),App.Vector(inner_x,-inner_y,0)))
-	geoList.append(Part.LineSegment(App.Vector(inner_x,-inner_y,0),App.Vector(inner_x,inner_y,0)))
-	geoList.append(Part.LineSegment(App.Vector(inner_x,inner_y,0),App.Vector(-inner_x,inner_y,0)))
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,inner_y,0),App.Vector(-inner_x,-inner_y,0)))
-	App.ActiveDocument.Sketch.addGeometry(geoList,False)
-
-	# constraints for fillets
-	conList = []
-	conList.append(Sketcher.Constraint('Coincident',4,2,5,1))
-	conList.append(Sketcher.Constraint('Coincident',5,2,6,1))
-	conList.append(Sketcher.Constraint('Coincident',6,2,7,1))
-	conList.append(Sketcher.Constraint('Coincident',7,2,4,1))
-	conList.append(Sketcher.Constraint('Horizontal',4))
-	conList.append(Sketcher.Constraint('Horizontal',6))
-	conList.append(Sketcher.Constraint('Vertical',5))
-	conList.append(Sketcher.Constraint('Vertical',7))
-	App.ActiveDocument.Sketch.addConstraint(conList)
-
-	# fillet squares
-	if cradius != 0:
-		App.ActiveDocument.Sketch.fillet(6,2,cradius)
-		App.ActiveDocument.Sketch.fillet(5,2,cradius)
-		App.ActiveDocument.Sketch.fillet(4,2,cradius)
-		App.ActiveDocument.Sketch.fillet(4,1,cradius)
-		App.ActiveDocument.Sketch.fillet(2,2,cradius)
-		App.ActiveDocument.Sketch.fillet(1,2,cradius)
-		App.ActiveDocument.Sketch.fillet(0,2,cradius)
-		App.ActiveDocument.Sketch.fillet(0,1,cradius)
+	new_body("RectangularTube")
 
 	# consider end cuts (center-to-center) in length calculation
 	if e1angle == 90:
@@ -463,20 +1887,27 @@ def rectangular_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2an
 	else:
 		length = length +  (side1 * math.tan(math.radians(90 - e1angle)) / 2) + (side1 * math.tan(math.radians(90 - e2angle)) / 2)
 
-	# boss extrude the sketch
-	App.activeDocument().Body.newObject("PartDesign::Pad","Pad")
-	App.activeDocument().Pad.Profile = App.activeDocument().Sketch
-	App.ActiveDocument.Pad.Length = length
-	App.ActiveDocument.recompute()  # requires recompute after each feature
+	# reuse the cross-section of this stock if it has already been sketched
+	profile_key = ('RectangularTube', side1, side2, wall, cradius)
+	if not cached_profile(profile_key, length):
 
-	# create sketches for end cuts
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch001') # front
-	App.activeDocument().Sketch001.Support = (App.activeDocument().YZ_Plane, [''])
-	App.activeDocument().Sketch001.MapMode = 'FlatFace'
+		# create sketch on the front plane
+		sketch = new_sketch('Sketch', 'XZ_Plane')
+
+		# sketch outer and inner squares with filleted corners
+		sketch.addGeometry(rounded_rectangle(outer_x, outer_y, cradius),False)
+		sketch.addGeometry(rounded_rectangle(inner_x, inner_y, cradius),False)
+
+		# boss extrude the sketch
+		pad('Pad', sketch, length)
+		recompute()  # requires recompute after each feature
 
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch003') # top
-	App.activeDocument().Sketch003.Support = (App.activeDocument().XY_Plane, [''])
-	App.activeDocument().Sketch003.MapMode = 'FlatFace'
+		# remember the cross-section for the next piece of this stock
+		store_profile(profile_key, sketch)
+
+	# create sketches for end cuts
+	sketch001 = new_sketch('Sketch001', 'YZ_Plane') # front
+	sketch003 = new_sketch('Sketch003', 'XY_Plane') # top
 
 	# determine location of end cuts
 	y = side1 / 2
@@ -486,9 +1917,9 @@ def rectangular_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2an
 
 	# sketch first end cut
 	if e1cutside == 1 and e1angle != 90:
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)),False)
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)),False)
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)),False)
 
 	elif e1cutside == 2 and e1angle!= 90:
 		y = side1 / 2
@@ -496,16 +1927,12 @@ def rectangular_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2an
 		x = -side1 / math.tan(math.radians(e2angle))
 		x2 = x1 + (side1 / math.tan(math.radians(e1angle)))
 
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x1,0),App.Vector(y,x2,0)),False)
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x2,0),App.Vector(y,x1,0)),False)
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x1,0),App.Vector(-y,x1,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x1,0),App.Vector(y,x2,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(y,x2,0),App.Vector(y,x1,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(y,x1,0),App.Vector(-y,x1,0)),False)
 
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket003")
-		App.activeDocument().Pocket003.Profile = App.activeDocument().Sketch003
-		App.ActiveDocument.Pocket003.Length = 1000
-		App.ActiveDocument.Pocket003.Length2 = 1000
-		App.ActiveDocument.Pocket003.Type = 4
-		App.ActiveDocument.recompute()
+		pocket('Pocket003', sketch003, 1000, 1000)
+		recompute()
 
 	# Fix End2CutSide add 90 when 2
 	if e2cutside == 2:
@@ -518,29 +1945,21 @@ def rectangular_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2an
 
 		# sketch second end cut
 		if e2angle != 90:
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)),False)
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)),False)
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
 
 		# extrude cut the end cuts
 		if e1angle != 90 or e2angle != 90:
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-			App.ActiveDocument.Pocket.Length = 1000
-			App.ActiveDocument.Pocket.Length2 = 1000
-			App.ActiveDocument.Pocket.Type = 4
-			App.ActiveDocument.recompute()
+			pocket('Pocket', sketch001, 1000, 1000)
+			recompute()
 
 	elif roffset == 90:
 
 		# extrude cut the first end cut
 		if e1angle != 90 and e1cutside == 1:
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-			App.ActiveDocument.Pocket.Length = 1000
-			App.ActiveDocument.Pocket.Length2 = 1000
-			App.ActiveDocument.Pocket.Type = 4
-			App.ActiveDocument.recompute()
+			pocket('Pocket', sketch001, 1000, 1000)
+			recompute()
 
 		# adjust for roffset
 		x = side2 / 2
@@ -550,50 +1969,36 @@ def rectangular_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2an
 
 		if e2angle != 90:
 			# create sketch for second end cut
-			App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch002')
-			App.activeDocument().Sketch002.Support = (App.activeDocument().XY_Plane, [''])
-			App.activeDocument().Sketch002.MapMode = 'FlatFace'
+			sketch002 = new_sketch('Sketch002', 'XY_Plane')
 
 			# sketch second end cut
-			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(-x,y,0)),False)
-			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,y,0),App.Vector(x,0,0)),False)
-			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(-x,0,0)),False)
+			sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(-x,y,0)),False)
+			sketch002.addGeometry(Part.LineSegment(App.Vector(-x,y,0),App.Vector(x,0,0)),False)
+			sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(-x,0,0)),False)
 
 			# extrude cut the second end cut
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-			App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch002
-			App.ActiveDocument.Pocket001.Length = 1000
-			App.ActiveDocument.Pocket001.Length2 = 1000
-			App.ActiveDocument.Pocket001.Type = 4
-			App.ActiveDocument.recompute()
+			pocket('Pocket001', sketch002, 1000, 1000)
+			recompute()
 
 	elif roffset == 180:  # parallel
 
 		if e2angle != 90:
 
 			# sketch second end cut
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x,-y,0),App.Vector(0,y,0)),False)
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,-y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(x,-y,0),App.Vector(0,y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,-y,0)),False)
 
 			# extrude cut both end cuts
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-			App.ActiveDocument.Pocket.Length = 1000
-			App.ActiveDocument.Pocket.Length2 = 1000
-			App.ActiveDocument.Pocket.Type = 4
-			App.ActiveDocument.recompute()
+			pocket('Pocket', sketch001, 1000, 1000)
+			recompute()
 
 	elif roffset == 270:
 
 		# extrude cut the first end cut
 		if e1angle != 90 and e1cutside == 1:
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-			App.ActiveDocument.Pocket.Length = side2
-			App.ActiveDocument.Pocket.Length2 = side2
-			App.ActiveDocument.Pocket.Type = 4
-			App.ActiveDocument.recompute()
+			pocket('Pocket', sketch001, side2, side2)
+			recompute()
 
 		# adjust for roffset
 		x = side2 / 2
@@ -604,31 +2009,20 @@ def rectangular_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2an
 		if e2angle != 90:
 
 			# create sketch for second end cut
-			App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch002')
-			App.activeDocument().Sketch002.Support = (App.activeDocument().XY_Plane, [''])
-			App.activeDocument().Sketch002.MapMode = 'FlatFace'
+			sketch002 = new_sketch('Sketch002', 'XY_Plane')
 
 			# sketch second end cut
-			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(x,y,0)),False)
-			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(-x,0,0)),False)
-			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(x,0,0)),False)
+			sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(x,y,0)),False)
+			sketch002.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(-x,0,0)),False)
+			sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(x,0,0)),False)
 
 			# extrude cut the second end cut
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-			App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch002
-			App.ActiveDocument.Pocket001.Length = 1000
-			App.ActiveDocument.Pocket001.Length2 = 1000
-			App.ActiveDocument.Pocket001.Type = 4
-			App.ActiveDocument.recompute()
-
+			pocket('Pocket001', sketch002, 1000, 1000)
+			recompute()
 
-	# rotate tube to fit horizontally in PieceMaker window
-	App.getDocument("RectangularTube").Body.Placement=App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0))
 
-	# render and save STL file
-	global __objs__
-	__objs__=[]
-	__objs__.append(FreeCAD.getDocument("RectangularTube").getObject("Body"))
+	# rotate tube to fit horizontally in PieceMaker window, and render
+	finish_body(App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0)))
 
 # generate angle iron tube STL file
 def angle_iron_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle, e1cutside, e2cutside):
@@ -646,53 +2040,7 @@ def angle_iron_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2ang
 	inner_y = outer_y - wall
 
 	# create new part with the PartDesign workbench
-	App.newDocument("AngleIronTube")
-	App.activeDocument().addObject('PartDesign::Body','Body')
-
-	# create sketch on the front plane
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch')
-	App.activeDocument().Sketch.Support = (App.activeDocument().XZ_Plane, [''])
-	App.activeDocument().Sketch.MapMode = 'FlatFace'
-
-	# sketch outer square
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,-outer_y,0),App.Vector(outer_x,-outer_y,0)))  # bottom edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,-outer_y,0),App.Vector(outer_x,outer_y,0)))  # right edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,outer_y,0),App.Vector(-outer_x,outer_y,0)))  # top edge
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,outer_y,0),App.Vector(-outer_x,-outer_y,0)))  # left edge
-	App.ActiveDocument.Sketch.addGeometry(geoList,False)
-
-	# constraints needed for fillet anchors
-	conList = []
-	conList.append(Sketcher.Constraint('Coincident',0,2,1,1))
-	conList.append(Sketcher.Constraint('Coincident',1,2,2,1))
-	conList.append(Sketcher.Constraint('Coincident',2,2,3,1))
-	conList.append(Sketcher.Constraint('Coincident',3,2,0,1))
-	conList.append(Sketcher.Constraint('Horizontal',0))
-	conList.append(Sketcher.Constraint('Horizontal',2))
-	conList.append(Sketcher.Constraint('Vertical',1))
-	conList.append(Sketcher.Constraint('Vertical',3))
-	App.ActiveDocument.Sketch.addConstraint(conList)
-
-	# sketch inner square
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,-inner_y,0),App.Vector(inner_x,-inner_y,0)))
-	geoList.append(Part.LineSegment(App.Vector(inner_x,-inner_y,0),App.Vector(inner_x,inner_y,0)))
-	geoList.append(Part.LineSegment(App.Vector(inner_x,inner_y,0),App.Vector(-inner_x,inner_y,0)))
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,inner_y,0),App.Vector(-inner_x,-inner_y,0)))
-	App.ActiveDocument.Sketch.addGeometry(geoList,False)
-
-	# constraints for fillets
-	conList = []
-	conList.append(Sketcher.Constraint('Coincident',4,2,5,1))
-	conList.append(Sketcher.Constraint('Coincident',5,2,6,1))
-	conList.append(Sketcher.Constraint('Coincident',6,2,7,1))
-	conList.append(Sketcher.Constraint('Coincident',7,2,4,1))
-	conList.append(Sketcher.Constraint('Horizontal',4))
-	conList.append(Sketcher.Constraint('Horizontal',6))
-	conList.append(Sketcher.Constraint('Vertical',5))
-	conList.append(Sketcher.Constraint('Vertical',7))
-	App.ActiveDocument.Sketch.addConstraint(conList)
+	new_body("AngleIronTube")
 
 	# consider end cuts (center-to-center) in length calculation
 	if e1angle == 90:
@@ -708,48 +2056,27 @@ def angle_iron_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2ang
 	else:
 		length = length +  (side1 * math.tan(math.radians(90 - e1angle)) / 2) + (side1 * math.tan(math.radians(90 - e2angle)) / 2)
 
-	# boss extrude the sketch
-	App.activeDocument().Body.newObject("PartDesign::Pad","Pad")
-	App.activeDocument().Pad.Profile = App.activeDocument().Sketch
-	App.ActiveDocument.Pad.Length = length
-	App.ActiveDocument.recompute()  # requires recompute after each feature
+	# reuse the cross-section of this stock if it has already been sketched
+	profile_key = ('AngleIronTube', side1, side2, wall, cradius)
+	if not cached_profile(profile_key, length):
 
-	# create sketch on the front plane to cut angle iron shape
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','SketchAngleIronCut')
-	App.activeDocument().SketchAngleIronCut.Support = (App.activeDocument().XZ_Plane, [''])
-	App.activeDocument().SketchAngleIronCut.MapMode = 'FlatFace'
+		# create sketch on the front plane
+		sketch = new_sketch('Sketch', 'XZ_Plane')
 
-	# sketch square to be removed
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,-inner_y,0),App.Vector(outer_x,-inner_y,0)))  # bottom edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,-inner_y,0),App.Vector(outer_x,outer_y,0)))  # right edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,outer_y,0),App.Vector(-inner_x,outer_y,0)))  # top edge
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,outer_y,0),App.Vector(-inner_x,-inner_y,0)))  # left edge
-	App.ActiveDocument.SketchAngleIronCut.addGeometry(geoList,False)
-
-	# extrude cut the square
-	App.activeDocument().Body.newObject("PartDesign::Pocket","PocketAngleIronCut")
-	App.activeDocument().PocketAngleIronCut.Profile = App.activeDocument().SketchAngleIronCut
-	App.ActiveDocument.PocketAngleIronCut.Length = 1000000000 # measured in mm, excessively high to account for any sized length
-	App.ActiveDocument.PocketAngleIronCut.Length2 = 1000000000
-	App.ActiveDocument.PocketAngleIronCut.Type = 4
-	App.ActiveDocument.recompute()
+		# sketch the L as one closed outline, heel and root filleted, legs up the left and along the bottom
+		points = [(-outer_x,-outer_y), (outer_x,-outer_y), (outer_x,-inner_y), (-inner_x,-inner_y), (-inner_x,outer_y), (-outer_x,outer_y)]
+		sketch.addGeometry(closed_profile(points, [cradius, 0, 0, cradius, 0, 0]),False)
 
-	#Note:  Filleting the edges isn't working at the moment, will uncomment when it is fixed
-	# fillet edges
-	#App.getDocument('AngleIronTube').getObject('Body').newObject('PartDesign::Fillet','Fillet')
-	#App.getDocument('AngleIronTube').getObject('Fillet').Radius = cradius * 0.8 # passed value of cradius too large
-	#App.getDocument('AngleIronTube').getObject('Fillet').Base = (App.getDocument('AngleIronTube').getObject('PocketAngleIronCut'),["Edge21","Edge9","Edge24"])
-	#App.getDocument('AngleIronTube').recompute()
+		# boss extrude the sketch
+		pad('Pad', sketch, length)
+		recompute()  # requires recompute after each feature
 
-	# create sketches for end cuts
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch001') # front
-	App.activeDocument().Sketch001.Support = (App.activeDocument().YZ_Plane, [''])
-	App.activeDocument().Sketch001.MapMode = 'FlatFace'
+		# remember the cross-section for the next piece of this stock
+		store_profile(profile_key, sketch)
 
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch003') # top
-	App.activeDocument().Sketch003.Support = (App.activeDocument().XY_Plane, [''])
-	App.activeDocument().Sketch003.MapMode = 'FlatFace'
+	# create sketches for end cuts
+	sketch001 = new_sketch('Sketch001', 'YZ_Plane') # front
+	sketch003 = new_sketch('Sketch003', 'XY_Plane') # top
 
 	# determine location of end cuts
 	y = side1 / 2
@@ -763,29 +2090,21 @@ def angle_iron_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2ang
 
 	# sketch first end cut
 	if e1cutside == 1 and e1angle != 90:
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)),False)
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)),False)
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)),False)
 
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket003")
-		App.activeDocument().Pocket003.Profile = App.activeDocument().Sketch001
-		App.ActiveDocument.Pocket003.Length = 1000
-		App.ActiveDocument.Pocket003.Length2 = 1000
-		App.ActiveDocument.Pocket003.Type = 4
-		App.ActiveDocument.recompute()
+		pocket('Pocket003', sketch001, 1000, 1000)
+		recompute()
 
 	elif e1cutside == 2 and e1angle != 90:
 
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x1,0),App.Vector(y,x2,0)),False)
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x2,0),App.Vector(y,x1,0)),False)
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x1,0),App.Vector(-y,x1,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x1,0),App.Vector(y,x2,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(y,x2,0),App.Vector(y,x1,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(y,x1,0),App.Vector(-y,x1,0)),False)
 
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket003")
-		App.activeDocument().Pocket003.Profile = App.activeDocument().Sketch003
-		App.ActiveDocument.Pocket003.Length = 1000
-		App.ActiveDocument.Pocket003.Length2 = 1000
-		App.ActiveDocument.Pocket003.Type = 4
-		App.ActiveDocument.recompute()
+		pocket('Pocket003', sketch003, 1000, 1000)
+		recompute()
 
 
 	# determine rotation of end cuts
@@ -793,79 +2112,46 @@ def angle_iron_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2ang
 
 		# sketch second end cut
 		if e2angle != 90:
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)),False)
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)),False)
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
 
 
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-			App.ActiveDocument.Pocket.Length = 1000
-			App.ActiveDocument.Pocket.Length2 = 1000
-			App.ActiveDocument.Pocket.Type = 4
-			App.ActiveDocument.recompute()
+			pocket('Pocket', sketch001, 1000, 1000)
+			recompute()
 
 	elif roffset == 90:
 
-
-
-		# adjust for roffset
-		#x = side2 / 2
-		#x1 = -length
-		#x2 = x1 - x
-		#y = -side2 / math.tan(math.radians(e2angle))
-
-
 		if e2angle != 90:
-			# create sketch for second end cut
-			#App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch002')
-			#App.activeDocument().Sketch002.Support = (App.activeDocument().XY_Plane, [''])
-			#App.activeDocument().Sketch002.MapMode = 'FlatFace'
 
 			# sketch second end cut
-			#App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(-x,y,0)),False)
-			#App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,y,0),App.Vector(x,0,0)),False)
-			#App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(-x,0,0)),False)
-
-			App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(y,x,0)),False)
-			App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x,0),App.Vector(y,0,0)),False)
-			App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
+			sketch003.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(y,x,0)),False)
+			sketch003.addGeometry(Part.LineSegment(App.Vector(y,x,0),App.Vector(y,0,0)),False)
+			sketch003.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
 
 			# extrude cut the second end cut
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-			App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch003
-			App.ActiveDocument.Pocket001.Length = 1000
-			App.ActiveDocument.Pocket001.Length2 = 1000
-			App.ActiveDocument.Pocket001.Type = 4
-			App.ActiveDocument.recompute()
+			pocket('Pocket001', sketch003, 1000, 1000)
+			recompute()
 
 	elif roffset == 180:  # parallel
 
 		if e2angle != 90:
 
 			# sketch second end cut
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x,-y,0),App.Vector(0,y,0)),False)
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,-y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(x,-y,0),App.Vector(0,y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,-y,0)),False)
 
 			# extrude cut both end cuts
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-			App.ActiveDocument.Pocket.Length = 1000
-			App.ActiveDocument.Pocket.Length2 = 1000
-			App.ActiveDocument.Pocket.Type = 4
-			App.ActiveDocument.recompute()
+			pocket('Pocket', sketch001, 1000, 1000)
+			recompute()
 
 	elif roffset == 270:
 
 		# extrude cut the first end cut
 		if e1angle != 90 and e1cutside == 1:
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-			App.ActiveDocument.Pocket.Length = side2
-			App.ActiveDocument.Pocket.Length2 = side2
-			App.ActiveDocument.Pocket.Type = 4
-			App.ActiveDocument.recompute()
+			pocket('Pocket', sketch001, side2, side2)
+			recompute()
 
 		# adjust for roffset
 		x = side2 / 2
@@ -876,31 +2162,19 @@ def angle_iron_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2ang
 		if e2angle != 90:
 
 			# create sketch for second end cut
-			App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch002')
-			App.activeDocument().Sketch002.Support = (App.activeDocument().XY_Plane, [''])
-			App.activeDocument().Sketch002.MapMode = 'FlatFace'
+			sketch002 = new_sketch('Sketch002', 'XY_Plane')
 
 			# sketch second end cut
-			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(x,y,0)),False)
-			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(-x,0,0)),False)
-			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(x,0,0)),False)
+			sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(x,y,0)),False)
+			sketch002.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(-x,0,0)),False)
+			sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(x,0,0)),False)
 
 			# extrude cut the second end cut
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-			App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch002
-			App.ActiveDocument.Pocket001.Length = 1000
-			App.ActiveDocument.Pocket001.Length2 = 1000
-			App.ActiveDocument.Pocket001.Type = 4
-			App.ActiveDocument.recompute()
-
-	# rotate tube to fit horizontally in PieceMaker window
-	App.getDocument("AngleIronTube").Body.Placement=App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0))
+			pocket('Pocket001', sketch002, 1000, 1000)
+			recompute()
 
-
-	# render and save STL file
-	global __objs__
-	__objs__=[]
-	__objs__.append(FreeCAD.getDocument("AngleIronTube").getObject("Body"))
+	# rotate tube to fit horizontally in PieceMaker window, and render
+	finish_body(App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0)))
 
 
 
@@ -921,21 +2195,7 @@ def flat_bar_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle
 	inner_y = outer_y - wall
 
 	# create new part with the PartDesign workbench
-	App.newDocument("FlatBarTube")
-	App.activeDocument().addObject('PartDesign::Body','Body')
-
-	# create sketch on the front plane
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch')
-	App.activeDocument().Sketch.Support = (App.activeDocument().XZ_Plane, [''])
-	App.activeDocument().Sketch.MapMode = 'FlatFace'
-
-	# sketch outer square
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,-outer_y,0),App.Vector(outer_x,-outer_y,0)))  # bottom edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,-outer_y,0),App.Vector(outer_x,outer_y,0)))  # right edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,outer_y,0),App.Vector(-outer_x,outer_y,0)))  # top edge
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,outer_y,0),App.Vector(-outer_x,-outer_y,0)))  # left edge
-	App.ActiveDocument.Sketch.addGeometry(geoList,False)
+	new_body("FlatBarTube")
 
 	# consider end cuts (center-to-center) in length calculation
 	if e1angle == 90:
@@ -951,37 +2211,26 @@ def flat_bar_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle
 	else:
 		length = length +  (side1 * math.tan(math.radians(90 - e1angle)) / 2) + (side1 * math.tan(math.radians(90 - e2angle)) / 2)
 
-	# boss extrude the sketch
-	App.activeDocument().Body.newObject("PartDesign::Pad","Pad")
-	App.activeDocument().Pad.Profile = App.activeDocument().Sketch
-	App.ActiveDocument.Pad.Length = length
-	App.ActiveDocument.recompute()  # requires recompute after each feature
+	# reuse the cross-section of this stock if it has already been sketched
+	profile_key = ('FlatBarTube', side1, side2, wall)
+	if not cached_profile(profile_key, length):
 
-	# create sketch on the front plane to cut flat bar shape
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','SketchFlatBarCut')
-	App.activeDocument().SketchFlatBarCut.Support = (App.activeDocument().XZ_Plane, [''])
-	App.activeDocument().SketchFlatBarCut.MapMode = 'FlatFace'
+		# create sketch on the front plane
+		sketch = new_sketch('Sketch', 'XZ_Plane')
 
-	# sketch square to be removed
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,-inner_y,0),App.Vector(outer_x,-inner_y,0)))  # bottom edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,-inner_y,0),App.Vector(outer_x,outer_y,0)))  # right edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,outer_y,0),App.Vector(-outer_x,outer_y,0)))  # top edge
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,outer_y,0),App.Vector(-outer_x,-inner_y,0)))  # left edge
-	App.ActiveDocument.SketchFlatBarCut.addGeometry(geoList,False)
-
-	# extrude cut the square
-	App.activeDocument().Body.newObject("PartDesign::Pocket","PocketFlatBarCut")
-	App.activeDocument().PocketFlatBarCut.Profile = App.activeDocument().SketchFlatBarCut
-	App.ActiveDocument.PocketFlatBarCut.Length = 1000000000 # measured in mm, excessively high to account for any sized length
-	App.ActiveDocument.PocketFlatBarCut.Length2 = 1000000000
-	App.ActiveDocument.PocketFlatBarCut.Type = 4
-	App.ActiveDocument.recompute()
+		# sketch the bar, one wall thick along the bottom of the stock
+		points = [(-outer_x,-outer_y), (outer_x,-outer_y), (outer_x,-inner_y), (-outer_x,-inner_y)]
+		sketch.addGeometry(closed_profile(points, [0, 0, 0, 0]),False)
+
+		# boss extrude the sketch
+		pad('Pad', sketch, length)
+		recompute()  # requires recompute after each feature
+
+		# remember the cross-section for the next piece of this stock
+		store_profile(profile_key, sketch)
 
 	# create sketches for end cuts
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch001') # front
-	App.activeDocument().Sketch001.Support = (App.activeDocument().XY_Plane, [''])
-	App.activeDocument().Sketch001.MapMode = 'FlatFace'
+	sketch001 = new_sketch('Sketch001', 'XY_Plane') # front
 
 
 
@@ -999,15 +2248,11 @@ def flat_bar_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle
 	# sketch first end cut
 	if e1angle != 90 and e1angle != 90:
 
-##                geoList.append(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)))
-##                geoList.append(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)))
-##                geoList.append(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)))
-
 		geoList.append(Part.LineSegment(App.Vector(-y,x1,0),App.Vector(y,x2,0)))
 		geoList.append(Part.LineSegment(App.Vector(y,x2,0),App.Vector(y,x1,0)))
 		geoList.append(Part.LineSegment(App.Vector(y,x1,0),App.Vector(-y,x1,0)))
 
-		App.ActiveDocument.Sketch001.addGeometry(geoList, False)
+		sketch001.addGeometry(geoList, False)
 
 	# determine rotation of end cuts
 	if roffset == 0:
@@ -1016,25 +2261,16 @@ def flat_bar_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle
 		if e2angle != 90:
 			geoList = []
 
-##                        geoList.append(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)))
-##                        geoList.append(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)))
-##                        geoList.append(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)))
-
 			geoList.append(Part.LineSegment(App.Vector(-y,0,0),App.Vector(y,x,0)))
 			geoList.append(Part.LineSegment(App.Vector(y,x,0),App.Vector(y,0,0)))
 			geoList.append(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)))
 
-			App.ActiveDocument.Sketch001.addGeometry(geoList, False)
+			sketch001.addGeometry(geoList, False)
 
 		# extrude cut the end cuts
 		if e1angle != 90 or e2angle != 90:
-			#App.ActiveDocument.Sketch001.addGeometry(geoList, False)
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-			App.ActiveDocument.Pocket.Length = 1000
-			App.ActiveDocument.Pocket.Length2 = 1000
-			App.ActiveDocument.Pocket.Type = 4
-			App.ActiveDocument.recompute()
+			pocket('Pocket', sketch001, 1000, 1000)
+			recompute()
 
 	elif roffset == 180:  # parallel
 
@@ -1042,38 +2278,23 @@ def flat_bar_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle
 			geoList = []
 
 			# sketch second end cut
-##                        App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x,-y,0),App.Vector(0,y,0)),False)
-##                        App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
-##                        App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,-y,0)),False)
-
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(-y,x,0),App.Vector(y,0,0)),False)
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
-			App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(-y,x,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(-y,x,0),App.Vector(y,0,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
+			sketch001.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(-y,x,0)),False)
 
 		# extrude cut both end cuts
 		if e1angle != 90 or e2angle != 90:
-			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-			App.ActiveDocument.Pocket.Length = 1000
-			App.ActiveDocument.Pocket.Length2 = 1000
-			App.ActiveDocument.Pocket.Type = 4
-			App.ActiveDocument.recompute()
-
-
-	# rotate tube to fit horizontally in PieceMaker window
-	App.getDocument("FlatBarTube").Body.Placement=App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0))
+			pocket('Pocket', sketch001, 1000, 1000)
+			recompute()
 
-	# render and save STL file
-	global __objs__
-	__objs__=[]
-	__objs__.append(FreeCAD.getDocument("FlatBarTube").getObject("Body"))
+	# rotate tube to fit horizontally in PieceMaker window, and render
+	finish_body(App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0)))
 
 
 
 # generate angle iron tube STL file
 def c_channel_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle, e1cutside, e2cutside):
 
-
 	if e1angle < 0:
 		e1angle = 360 - e1angle
 	if e2angle < 0:
@@ -1087,53 +2308,7 @@ def c_channel_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angl
 	inner_y = outer_y - wall
 
 	# create new part with the PartDesign workbench
-	App.newDocument("CChannelTube")
-	App.activeDocument().addObject('PartDesign::Body','Body')
-
-	# create sketch on the front plane
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch')
-	App.activeDocument().Sketch.Support = (App.activeDocument().XZ_Plane, [''])
-	App.activeDocument().Sketch.MapMode = 'FlatFace'
-
-	# sketch outer square
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,-outer_y,0),App.Vector(outer_x,-outer_y,0)))  # bottom edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,-outer_y,0),App.Vector(outer_x,outer_y,0)))  # right edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,outer_y,0),App.Vector(-outer_x,outer_y,0)))  # top edge
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,outer_y,0),App.Vector(-outer_x,-outer_y,0)))  # left edge
-	App.ActiveDocument.Sketch.addGeometry(geoList,False)
-
-##	# constraints needed for fillet anchors
-##	conList = []
-##	conList.append(Sketcher.Constraint('Coincident',0,2,1,1))
-##	conList.append(Sketcher.Constraint('Coincident',1,2,2,1))
-##	conList.append(Sketcher.Constraint('Coincident',2,2,3,1))
-##	conList.append(Sketcher.Constraint('Coincident',3,2,0,1))
-##	conList.append(Sketcher.Constraint('Horizontal',0))
-##	conList.append(Sketcher.Constraint('Horizontal',2))
-##	conList.append(Sketcher.Constraint('Vertical',1))
-##	conList.append(Sketcher.Constraint('Vertical',3))
-##	App.ActiveDocument.Sketch.addConstraint(conList)
-
-	# sketch inner square
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,-inner_y,0),App.Vector(inner_x,-inner_y,0)))
-	geoList.append(Part.LineSegment(App.Vector(inner_x,-inner_y,0),App.Vector(inner_x,inner_y,0)))
-	geoList.append(Part.LineSegment(App.Vector(inner_x,inner_y,0),App.Vector(-inner_x,inner_y,0)))
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,inner_y,0),App.Vector(-inner_x,-inner_y,0)))
-	App.ActiveDocument.Sketch.addGeometry(geoList,False)
-
-##	# constraints for fillets
-##	conList = []
-##	conList.append(Sketcher.Constraint('Coincident',4,2,5,1))
-##	conList.append(Sketcher.Constraint('Coincident',5,2,6,1))
-##	conList.append(Sketcher.Constraint('Coincident',6,2,7,1))
-##	conList.append(Sketcher.Constraint('Coincident',7,2,4,1))
-##	conList.append(Sketcher.Constraint('Horizontal',4))
-##	conList.append(Sketcher.Constraint('Horizontal',6))
-##	conList.append(Sketcher.Constraint('Vertical',5))
-##	conList.append(Sketcher.Constraint('Vertical',7))
-##	App.ActiveDocument.Sketch.addConstraint(conList)
+	new_body("CChannelTube")
 
 	# consider end cuts (center-to-center) in length calculation
 	if e1angle == 90:
@@ -1149,47 +2324,27 @@ def c_channel_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angl
 	else:
 		length = length +  (side1 * math.tan(math.radians(90 - e1angle)) / 2) + (side1 * math.tan(math.radians(90 - e2angle)) / 2)
 
-	# boss extrude the sketch
-	App.activeDocument().Body.newObject("PartDesign::Pad","Pad")
-	App.activeDocument().Pad.Profile = App.activeDocument().Sketch
-	App.ActiveDocument.Pad.Length = length
-	App.ActiveDocument.recompute()  # requires recompute after each feature
+	# reuse the cross-section of this stock if it has already been sketched
+	profile_key = ('CChannelTube', side1, side2, wall, cradius)
+	if not cached_profile(profile_key, length):
 
-	# create sketch on the front plane to cut angle iron shape
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','SketchCChannelCut')
-	App.activeDocument().SketchCChannelCut.Support = (App.activeDocument().XZ_Plane, [''])
-	App.activeDocument().SketchCChannelCut.MapMode = 'FlatFace'
+		# create sketch on the front plane
+		sketch = new_sketch('Sketch', 'XZ_Plane')
 
-	# sketch square to be removed
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,-inner_y,0),App.Vector(inner_x,-inner_y,0)))  # bottom edge
-	geoList.append(Part.LineSegment(App.Vector(inner_x,-inner_y,0),App.Vector(inner_x,outer_y,0)))  # right edge
-	geoList.append(Part.LineSegment(App.Vector(inner_x,outer_y,0),App.Vector(-inner_x,outer_y,0)))  # top edge
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,outer_y,0),App.Vector(-inner_x,-inner_y,0)))  # left edge
-	App.ActiveDocument.SketchCChannelCut.addGeometry(geoList,False)
-
-	# extrude cut the square
-	App.activeDocument().Body.newObject("PartDesign::Pocket","PocketCChannelCut")
-	App.activeDocument().PocketCChannelCut.Profile = App.activeDocument().SketchCChannelCut
-	App.ActiveDocument.PocketCChannelCut.Length = 1000000000 # measured in mm, excessively high to account for any sized length
-	App.ActiveDocument.PocketCChannelCut.Length2 = 1000000000
-	App.ActiveDocument.PocketCChannelCut.Type = 4
-	App.ActiveDocument.recompute()
+		# sketch the C as one closed outline, open at the top, outer and inner bends filleted
+		points = [(-outer_x,-outer_y), (outer_x,-outer_y), (outer_x,outer_y), (inner_x,outer_y), (inner_x,-inner_y), (-inner_x,-inner_y), (-inner_x,outer_y), (-outer_x,outer_y)]
+		sketch.addGeometry(closed_profile(points, [cradius, cradius, 0, 0, cradius, cradius, 0, 0]),False)
 
-##	# fillet edges
-##	App.getDocument('CChannelTube').getObject('Body').newObject('PartDesign::Fillet','Fillet')
-##	App.getDocument('CChannelTube').getObject('Fillet').Radius = cradius * 0.8 # passed value of cradius too large
-##	App.getDocument('CChannelTube').getObject('Fillet').Base = (App.getDocument('CChannelTube').getObject('PocketCChannelCut'),["Edge21","Edge9","Edge24"])
-##	App.getDocument('CChannelTube').recompute()
+		# boss extrude the sketch
+		pad('Pad', sketch, length)
+		recompute()  # requires recompute after each feature
 
-	# create sketches for end cuts
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch001') # front
-	App.activeDocument().Sketch001.Support = (App.activeDocument().YZ_Plane, [''])
-	App.activeDocument().Sketch001.MapMode = 'FlatFace'
+		# remember the cross-section for the next piece of this stock
+		store_profile(profile_key, sketch)
 
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch003') # top
-	App.activeDocument().Sketch003.Support = (App.activeDocument().XY_Plane, [''])
-	App.activeDocument().Sketch003.MapMode = 'FlatFace'
+	# create sketches for end cuts
+	sketch001 = new_sketch('Sketch001', 'YZ_Plane') # front
+	sketch003 = new_sketch('Sketch003', 'XY_Plane') # top
 
 	# determine location of end cuts
 	y = side1 / 2
@@ -1203,16 +2358,12 @@ def c_channel_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angl
 
 	# sketch first end cut
 	if e1cutside == 1 and e1angle != 90:
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)),False)
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)),False)
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)),False)
 
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket003")
-		App.activeDocument().Pocket003.Profile = App.activeDocument().Sketch001
-		App.ActiveDocument.Pocket003.Length = 1000
-		App.ActiveDocument.Pocket003.Length2 = 1000
-		App.ActiveDocument.Pocket003.Type = 4
-		App.ActiveDocument.recompute()
+		pocket('Pocket003', sketch001, 1000, 1000)
+		recompute()
 
 	elif e1cutside == 2 and e1angle != 90:
 		y = side1 / 2
@@ -1220,23 +2371,12 @@ def c_channel_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angl
 		x = -side1 / math.tan(math.radians(e2angle))
 		x2 = x1 + (side1 / math.tan(math.radians(e1angle)))
 
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x1,0),App.Vector(y,x2,0)),False)
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x2,0),App.Vector(y,x1,0)),False)
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x1,0),App.Vector(-y,x1,0)),False)
-
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket003")
-		App.activeDocument().Pocket003.Profile = App.activeDocument().Sketch003
-		App.ActiveDocument.Pocket003.Length = 1000
-		App.ActiveDocument.Pocket003.Length2 = 1000
-		App.ActiveDocument.Pocket003.Type = 4
-		App.ActiveDocument.recompute()
+		sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x1,0),App.Vector(y,x2,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(y,x2,0),App.Vector(y,x1,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(y,x1,0),App.Vector(-y,x1,0)),False)
 
-	##filename = os.path.dirname(os.path.abspath(__file__))
-	##filename.replace("//","/")
-	##filename += "/Test1.FCStd"
-	##App.ActiveDocument.saveAs(filename)
-	##App.closeDocument("CChannelTube")
-	##FreeCAD.openDocument(filename)
+		pocket('Pocket003', sketch003, 1000, 1000)
+		recompute()
 
 	# determine rotation of end cuts
 	if roffset == 0:
@@ -1245,66 +2385,22 @@ def c_channel_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angl
 		if e2angle != 90:
 
 			if e2cutside == 1:
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)),False)
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)),False)
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
 
 				# extrude cut the end cuts
-				App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket002")
-				App.activeDocument().Pocket002.Profile = App.activeDocument().Sketch001
-				App.ActiveDocument.Pocket002.Length = 1000
-				App.ActiveDocument.Pocket002.Length2 = 1000
-				App.ActiveDocument.Pocket002.Type = 4
-				App.ActiveDocument.recompute()
+				pocket('Pocket002', sketch001, 1000, 1000)
+				recompute()
 
 			elif e2cutside == 2:
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(y,x,0)),False)
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x,0),App.Vector(y,0,0)),False)
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(y,x,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(y,x,0),App.Vector(y,0,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
 
 				# extrude cut the end cuts
-				App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket002")
-				App.activeDocument().Pocket002.Profile = App.activeDocument().Sketch003
-				App.ActiveDocument.Pocket002.Length = 1000
-				App.ActiveDocument.Pocket002.Length2 = 1000
-				App.ActiveDocument.Pocket002.Type = 4
-				App.ActiveDocument.recompute()
-
-##	elif roffset == 90:
-##
-##		# extrude cut the first end cut
-##		if e1angle != 90 and e1cutside == 1:
-##			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-##			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-##			App.ActiveDocument.Pocket.Length = 1000
-##			App.ActiveDocument.Pocket.Length2 = 1000
-##			App.ActiveDocument.Pocket.Type = 4
-##			App.ActiveDocument.recompute()
-##
-##		# adjust for roffset
-##		x = side2 / 2
-##		x1 = -length
-##		x2 = x1 - x
-##		y = -side2 / math.tan(math.radians(e2angle))
-##
-##		if e2angle != 90:
-##			# create sketch for second end cut
-##			App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch002')
-##			App.activeDocument().Sketch002.Support = (App.activeDocument().XY_Plane, [''])
-##			App.activeDocument().Sketch002.MapMode = 'FlatFace'
-##
-##			# sketch second end cut
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(-x,y,0)),False)
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,y,0),App.Vector(x,0,0)),False)
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(-x,0,0)),False)
-##
-##			# extrude cut the second end cut
-##			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-##			App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch002
-##			App.ActiveDocument.Pocket001.Length = 1000
-##			App.ActiveDocument.Pocket001.Length2 = 1000
-##			App.ActiveDocument.Pocket001.Type = 4
-##			App.ActiveDocument.recompute()
+				pocket('Pocket002', sketch003, 1000, 1000)
+				recompute()
 
 	elif roffset == 180:  # parallel
 
@@ -1312,149 +2408,52 @@ def c_channel_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angl
 
 			# sketch second end cut
 			if e2cutside == 1:
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x,-y,0),App.Vector(0,y,0)),False)
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,-y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(x,-y,0),App.Vector(0,y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,-y,0)),False)
 
 				# extrude cut the end cuts
-				App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket002")
-				App.activeDocument().Pocket002.Profile = App.activeDocument().Sketch001
-				App.ActiveDocument.Pocket002.Length = 1000
-				App.ActiveDocument.Pocket002.Length2 = 1000
-				App.ActiveDocument.Pocket002.Type = 4
-				App.ActiveDocument.recompute()
+				pocket('Pocket002', sketch001, 1000, 1000)
+				recompute()
 
 			elif e2cutside == 2:
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x,0),App.Vector(y,0,0)),False)
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(-y,x,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x,0),App.Vector(y,0,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(-y,x,0)),False)
 
 				# extrude cut the end cuts
-				App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket004")
-				App.activeDocument().Pocket004.Profile = App.activeDocument().Sketch003
-				App.ActiveDocument.Pocket004.Length = 1000
-				App.ActiveDocument.Pocket004.Length2 = 1000
-				App.ActiveDocument.Pocket004.Type = 4
-				App.ActiveDocument.recompute()
-
-##	elif roffset == 270:
-##
-##		# extrude cut the first end cut
-##		if e1angle != 90 and e1cutside == 1:
-##			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-##			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-##			App.ActiveDocument.Pocket.Length = side2
-##			App.ActiveDocument.Pocket.Length2 = side2
-##			App.ActiveDocument.Pocket.Type = 4
-##			App.ActiveDocument.recompute()
-##
-##		# adjust for roffset
-##		x = side2 / 2
-##		x1 = -length
-##		x2 = x1 - x
-##		y = -side2 / math.tan(math.radians(e2angle))
-##
-##		if e2angle != 90:
-##
-##			# create sketch for second end cut
-##			App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch002')
-##			App.activeDocument().Sketch002.Support = (App.activeDocument().XY_Plane, [''])
-##			App.activeDocument().Sketch002.MapMode = 'FlatFace'
-##
-##			# sketch second end cut
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(x,y,0)),False)
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(-x,0,0)),False)
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(x,0,0)),False)
-##
-##			# extrude cut the second end cut
-##			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-##			App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch002
-##			App.ActiveDocument.Pocket001.Length = 1000
-##			App.ActiveDocument.Pocket001.Length2 = 1000
-##			App.ActiveDocument.Pocket001.Type = 4
-##			App.ActiveDocument.recompute()
-
-	#App.ActiveDocument.save()
-
-	# rotate tube to fit horizontally in PieceMaker window
-	App.ActiveDocument.Body.Placement=App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0))
-	#App.getDocument(filename).Body.Placement=App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0))
-
-	# render and save STL file
-	global __objs__
-	__objs__=[]
-	#__objs__.append(App.ActiveDocument.getObject("Body"))
-	__objs__.append(FreeCAD.getDocument("CChannelTube").getObject("Body"))
+				pocket('Pocket004', sketch003, 1000, 1000)
+				recompute()
 
+	# rotate tube to fit horizontally in PieceMaker window, and render
+	finish_body(App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0)))
 
 
 
 
 
-# generate I-Beam tube STL file
-def i_beam_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle, e1cutside, e2cutside):
 
+# generate I-Beam tube STL file
+def i_beam_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle, e1cutside, e2cutside, flange=None):
 
 	while e1angle < 0:
 		e1angle += 360
 	while e2angle < 0:
 		e2angle += 360
 
-	# calculate positions of corners for square face
+	# flanges as thick as the web unless the stock gives their own thickness
+	if flange is None:
+		flange = wall
+
+	# calculate positions of corners for square face, the flanges run down the sides and the web across the middle
 	outer_x = 0.5 * side1
 	outer_y = 0.5 * side2
 
-	inner_x = outer_x - wall
+	inner_x = outer_x - flange
 	inner_y = outer_y - wall
 
 	# create new part with the PartDesign workbench
-	App.newDocument("IBeamTube")
-	App.activeDocument().addObject('PartDesign::Body','Body')
-
-	# create sketch on the front plane
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch')
-	App.activeDocument().Sketch.Support = (App.activeDocument().XZ_Plane, [''])
-	App.activeDocument().Sketch.MapMode = 'FlatFace'
-
-	# sketch outer square
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,-outer_y,0),App.Vector(outer_x,-outer_y,0)))  # bottom edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,-outer_y,0),App.Vector(outer_x,outer_y,0)))  # right edge
-	geoList.append(Part.LineSegment(App.Vector(outer_x,outer_y,0),App.Vector(-outer_x,outer_y,0)))  # top edge
-	geoList.append(Part.LineSegment(App.Vector(-outer_x,outer_y,0),App.Vector(-outer_x,-outer_y,0)))  # left edge
-	App.ActiveDocument.Sketch.addGeometry(geoList,False)
-
-##	# constraints needed for fillet anchors
-##	conList = []
-##	conList.append(Sketcher.Constraint('Coincident',0,2,1,1))
-##	conList.append(Sketcher.Constraint('Coincident',1,2,2,1))
-##	conList.append(Sketcher.Constraint('Coincident',2,2,3,1))
-##	conList.append(Sketcher.Constraint('Coincident',3,2,0,1))
-##	conList.append(Sketcher.Constraint('Horizontal',0))
-##	conList.append(Sketcher.Constraint('Horizontal',2))
-##	conList.append(Sketcher.Constraint('Vertical',1))
-##	conList.append(Sketcher.Constraint('Vertical',3))
-##	App.ActiveDocument.Sketch.addConstraint(conList)
-
-##	# sketch inner square
-##	geoList = []
-##	geoList.append(Part.LineSegment(App.Vector(-inner_x,-inner_y,0),App.Vector(inner_x,-inner_y,0)))
-##	geoList.append(Part.LineSegment(App.Vector(inner_x,-inner_y,0),App.Vector(inner_x,inner_y,0)))
-##	geoList.append(Part.LineSegment(App.Vector(inner_x,inner_y,0),App.Vector(-inner_x,inner_y,0)))
-##	geoList.append(Part.LineSegment(App.Vector(-inner_x,inner_y,0),App.Vector(-inner_x,-inner_y,0)))
-##	App.ActiveDocument.Sketch.addGeometry(geoList,False)
-
-##	# constraints for fillets
-##	conList = []
-##	conList.append(Sketcher.Constraint('Coincident',4,2,5,1))
-##	conList.append(Sketcher.Constraint('Coincident',5,2,6,1))
-##	conList.append(Sketcher.Constraint('Coincident',6,2,7,1))
-##	conList.append(Sketcher.Constraint('Coincident',7,2,4,1))
-##	conList.append(Sketcher.Constraint('Horizontal',4))
-##	conList.append(Sketcher.Constraint('Horizontal',6))
-##	conList.append(Sketcher.Constraint('Vertical',5))
-##	conList.append(Sketcher.Constraint('Vertical',7))
-##	App.ActiveDocument.Sketch.addConstraint(conList)
+	new_body("IBeamTube")
 
 	# consider end cuts (center-to-center) in length calculation
 	if e1angle == 90:
@@ -1470,58 +2469,29 @@ def i_beam_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle,
 	else:
 		length = length +  (side1 * math.tan(math.radians(90 - e1angle)) / 2) + (side1 * math.tan(math.radians(90 - e2angle)) / 2)
 
-	# boss extrude the sketch
-	App.activeDocument().Body.newObject("PartDesign::Pad","Pad")
-	App.activeDocument().Pad.Profile = App.activeDocument().Sketch
-	App.ActiveDocument.Pad.Length = length
-	App.ActiveDocument.recompute()  # requires recompute after each feature
-
-	# create sketch on the front plane to cut I-Beam shape
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','SketchIBeamCut')
-	App.activeDocument().SketchIBeamCut.Support = (App.activeDocument().XZ_Plane, [''])
-	App.activeDocument().SketchIBeamCut.MapMode = 'FlatFace'
+	# reuse the cross-section of this stock if it has already been sketched
+	profile_key = ('IBeamTube', side1, side2, wall, cradius, flange)
+	if not cached_profile(profile_key, length):
 
-	# sketch squares to be removed
-	# Two squares, one going from -outery to -1/2wall, the other going from 1/2wall to outery
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,-outer_y,0),App.Vector(inner_x,-outer_y,0)))  # bottom edge
-	geoList.append(Part.LineSegment(App.Vector(inner_x,-outer_y,0),App.Vector(inner_x,(-1/2 * wall),0)))  # right edge
-	geoList.append(Part.LineSegment(App.Vector(inner_x,(-1/2 * wall),0),App.Vector(-inner_x,(-1/2 * wall),0)))  # top edge
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,(-1/2 * wall),0),App.Vector(-inner_x,-outer_y,0)))  # left edge
-	App.ActiveDocument.SketchIBeamCut.addGeometry(geoList,False)
-
-	geoList = []
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,(1/2 * wall),0),App.Vector(inner_x,(1/2 * wall),0)))  # bottom edge
-	geoList.append(Part.LineSegment(App.Vector(inner_x,(1/2 * wall),0),App.Vector(inner_x,outer_y,0)))  # right edge
-	geoList.append(Part.LineSegment(App.Vector(inner_x,outer_y,0),App.Vector(-inner_x,outer_y,0)))  # top edge
-	geoList.append(Part.LineSegment(App.Vector(-inner_x,outer_y,0),App.Vector(-inner_x,(1/2 * wall),0)))  # left edge
-	App.ActiveDocument.SketchIBeamCut.addGeometry(geoList,False)
+		# create sketch on the front plane
+		sketch = new_sketch('Sketch', 'XZ_Plane')
 
+		# sketch the I as one closed outline, flange thick flanges down the left and right joined by a wall thick web, roots filleted
+		web_y = 0.5 * wall
+		points = [(-outer_x,-outer_y), (-inner_x,-outer_y), (-inner_x,-web_y), (inner_x,-web_y), (inner_x,-outer_y), (outer_x,-outer_y),
+			(outer_x,outer_y), (inner_x,outer_y), (inner_x,web_y), (-inner_x,web_y), (-inner_x,outer_y), (-outer_x,outer_y)]
+		sketch.addGeometry(closed_profile(points, [0, 0, cradius, cradius, 0, 0, 0, 0, cradius, cradius, 0, 0]),False)
 
+		# boss extrude the sketch
+		pad('Pad', sketch, length)
+		recompute()  # requires recompute after each feature
 
-	# extrude cut the squares
-	App.activeDocument().Body.newObject("PartDesign::Pocket","PocketIBeamCut")
-	App.activeDocument().PocketIBeamCut.Profile = App.activeDocument().SketchIBeamCut
-	App.ActiveDocument.PocketIBeamCut.Length = 1000000000 # measured in mm, excessively high to account for any sized length
-	App.ActiveDocument.PocketIBeamCut.Length2 = 1000000000
-	App.ActiveDocument.PocketIBeamCut.Type = 4
-	App.ActiveDocument.recompute()
-
-##	# fillet edges
-##	App.getDocument('CChannelTube').getObject('Body').newObject('PartDesign::Fillet','Fillet')
-##	App.getDocument('CChannelTube').getObject('Fillet').Radius = cradius * 0.8 # passed value of cradius too large
-##	App.getDocument('CChannelTube').getObject('Fillet').Base = (App.getDocument('CChannelTube').getObject('PocketCChannelCut'),["Edge21","Edge9","Edge24"])
-##	App.getDocument('CChannelTube').recompute()
+		# remember the cross-section for the next piece of this stock
+		store_profile(profile_key, sketch)
 
 	# create sketches for end cuts
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch001') # front
-	App.activeDocument().Sketch001.Support = (App.activeDocument().YZ_Plane, [''])
-	App.activeDocument().Sketch001.MapMode = 'FlatFace'
-
-	App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch003') # top
-	App.activeDocument().Sketch003.Support = (App.activeDocument().XY_Plane, [''])
-	App.activeDocument().Sketch003.MapMode = 'FlatFace'
-
+	sketch001 = new_sketch('Sketch001', 'YZ_Plane') # front
+	sketch003 = new_sketch('Sketch003', 'XY_Plane') # top
 
 
 	# determine location of end cuts
@@ -1536,16 +2506,12 @@ def i_beam_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle,
 
 	# sketch first end cut
 	if e1cutside == 1 and e1angle != 90:
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)),False)
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)),False)
-		App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x1,-y,0),App.Vector(x2,y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x2,y,0),App.Vector(x1,y,0)),False)
+		sketch001.addGeometry(Part.LineSegment(App.Vector(x1,y,0),App.Vector(x1,-y,0)),False)
 
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-		App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch001
-		App.ActiveDocument.Pocket001.Length = 1000
-		App.ActiveDocument.Pocket001.Length2 = 1000
-		App.ActiveDocument.Pocket001.Type = 4
-		App.ActiveDocument.recompute()
+		pocket('Pocket001', sketch001, 1000, 1000)
+		recompute()
 
 	elif e1cutside == 2 and e1angle!= 90:
 		y = side1 / 2
@@ -1553,16 +2519,12 @@ def i_beam_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle,
 		x = -side1 / math.tan(math.radians(e2angle))
 		x2 = x1 + (side1 / math.tan(math.radians(e1angle)))
 
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x1,0),App.Vector(y,x2,0)),False)
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x2,0),App.Vector(y,x1,0)),False)
-		App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x1,0),App.Vector(-y,x1,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x1,0),App.Vector(y,x2,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(y,x2,0),App.Vector(y,x1,0)),False)
+		sketch003.addGeometry(Part.LineSegment(App.Vector(y,x1,0),App.Vector(-y,x1,0)),False)
 
-		App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket003")
-		App.activeDocument().Pocket003.Profile = App.activeDocument().Sketch003
-		App.ActiveDocument.Pocket003.Length = 1000
-		App.ActiveDocument.Pocket003.Length2 = 1000
-		App.ActiveDocument.Pocket003.Type = 4
-		App.ActiveDocument.recompute()
+		pocket('Pocket003', sketch003, 1000, 1000)
+		recompute()
 
 	# determine rotation of end cuts
 	if roffset == 0:
@@ -1571,68 +2533,23 @@ def i_beam_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle,
 		if e2angle != 90:
 
 			if e2cutside == 1:
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)),False)
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)),False)
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(0,y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
 
 				# extrude cut the end cuts
-				App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket002")
-				App.activeDocument().Pocket002.Profile = App.activeDocument().Sketch001
-				App.ActiveDocument.Pocket002.Length = 1000
-				App.ActiveDocument.Pocket002.Length2 = 1000
-				App.ActiveDocument.Pocket002.Type = 4
-				App.ActiveDocument.recompute()
+				pocket('Pocket002', sketch001, 1000, 1000)
+				recompute()
 
 			elif e2cutside == 2:
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(y,x,0)),False)
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,x,0),App.Vector(y,0,0)),False)
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(y,x,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(y,x,0),App.Vector(y,0,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
 
 				# extrude cut the end cuts
-				App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket004")
-				App.activeDocument().Pocket004.Profile = App.activeDocument().Sketch003
-				App.ActiveDocument.Pocket004.Length = 1000
-				App.ActiveDocument.Pocket004.Length2 = 1000
-				App.ActiveDocument.Pocket004.Type = 4
-				App.ActiveDocument.recompute()
-
-
-
-##	elif roffset == 90:
-##
-##		# extrude cut the first end cut
-##		if e1angle != 90 and e1cutside == 1:
-##			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-##			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-##			App.ActiveDocument.Pocket.Length = 1000
-##			App.ActiveDocument.Pocket.Length2 = 1000
-##			App.ActiveDocument.Pocket.Type = 4
-##			App.ActiveDocument.recompute()
-##
-##		# adjust for roffset
-##		x = side2 / 2
-##		x1 = -length
-##		x2 = x1 - x
-##		y = -side2 / math.tan(math.radians(e2angle))
-##
-##		if e2angle != 90:
-##			# create sketch for second end cut
-##			App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch002')
-##			App.activeDocument().Sketch002.Support = (App.activeDocument().XY_Plane, [''])
-##			App.activeDocument().Sketch002.MapMode = 'FlatFace'
-##
-##			# sketch second end cut
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(-x,y,0)),False)
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,y,0),App.Vector(x,0,0)),False)
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(-x,0,0)),False)
-##
-##			# extrude cut the second end cut
-##			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-##			App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch002
-##			App.ActiveDocument.Pocket001.Length = 1000
-##			App.ActiveDocument.Pocket001.Length2 = 1000
-##			App.ActiveDocument.Pocket001.Type = 4
-##			App.ActiveDocument.recompute()
+				pocket('Pocket004', sketch003, 1000, 1000)
+				recompute()
+
 
 	elif roffset == 180:  # parallel
 
@@ -1640,417 +2557,320 @@ def i_beam_tube(side1, side2, wall, cradius, length, roffset, e1angle, e2angle,
 
 			# sketch second end cut
 			if e2cutside == 1:
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(x,-y,0),App.Vector(0,y,0)),False)
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
-				App.ActiveDocument.Sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,-y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(x,-y,0),App.Vector(0,y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(0,y,0),App.Vector(0,-y,0)),False)
+				sketch001.addGeometry(Part.LineSegment(App.Vector(0,-y,0),App.Vector(x,-y,0)),False)
 
 				# extrude cut the end cuts
-				App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket002")
-				App.activeDocument().Pocket002.Profile = App.activeDocument().Sketch001
-				App.ActiveDocument.Pocket002.Length = 1000
-				App.ActiveDocument.Pocket002.Length2 = 1000
-				App.ActiveDocument.Pocket002.Type = 4
-				App.ActiveDocument.recompute()
+				pocket('Pocket002', sketch001, 1000, 1000)
+				recompute()
 
 			elif e2cutside == 2:
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x,0),App.Vector(y,0,0)),False)
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
-				App.ActiveDocument.Sketch003.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(-y,x,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(-y,x,0),App.Vector(y,0,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(y,0,0),App.Vector(-y,0,0)),False)
+				sketch003.addGeometry(Part.LineSegment(App.Vector(-y,0,0),App.Vector(-y,x,0)),False)
 
 				# extrude cut the end cuts
-				App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket004")
-				App.activeDocument().Pocket004.Profile = App.activeDocument().Sketch003
-				App.ActiveDocument.Pocket004.Length = 1000
-				App.ActiveDocument.Pocket004.Length2 = 1000
-				App.ActiveDocument.Pocket004.Type = 4
-				App.ActiveDocument.recompute()
-
-
-##	elif roffset == 270:
-##
-##		# extrude cut the first end cut
-##		if e1angle != 90 and e1cutside == 1:
-##			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket")
-##			App.activeDocument().Pocket.Profile = App.activeDocument().Sketch001
-##			App.ActiveDocument.Pocket.Length = side2
-##			App.ActiveDocument.Pocket.Length2 = side2
-##			App.ActiveDocument.Pocket.Type = 4
-##			App.ActiveDocument.recompute()
-##
-##		# adjust for roffset
-##		x = side2 / 2
-##		x1 = -length
-##		x2 = x1 - x
-##		y = -side2 / math.tan(math.radians(e2angle))
-##
-##		if e2angle != 90:
-##
-##			# create sketch for second end cut
-##			App.activeDocument().Body.newObject('Sketcher::SketchObject','Sketch002')
-##			App.activeDocument().Sketch002.Support = (App.activeDocument().XY_Plane, [''])
-##			App.activeDocument().Sketch002.MapMode = 'FlatFace'
-##
-##			# sketch second end cut
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,0,0),App.Vector(x,y,0)),False)
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(x,y,0),App.Vector(-x,0,0)),False)
-##			App.ActiveDocument.Sketch002.addGeometry(Part.LineSegment(App.Vector(-x,0,0),App.Vector(x,0,0)),False)
-##
-##			# extrude cut the second end cut
-##			App.activeDocument().Body.newObject("PartDesign::Pocket","Pocket001")
-##			App.activeDocument().Pocket001.Profile = App.activeDocument().Sketch002
-##			App.ActiveDocument.Pocket001.Length = 1000
-##			App.ActiveDocument.Pocket001.Length2 = 1000
-##			App.ActiveDocument.Pocket001.Type = 4
-##			App.ActiveDocument.recompute()
-
-	# rotate tube to fit horizontally in PieceMaker window
-	App.getDocument("IBeamTube").Body.Placement=App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0))
-
-	# render and save STL file
-	global __objs__
-	__objs__=[]
-	__objs__.append(FreeCAD.getDocument("IBeamTube").getObject("Body"))
+				pocket('Pocket004', sketch003, 1000, 1000)
+				recompute()
 
+	# rotate tube to fit horizontally in PieceMaker window, and render
+	finish_body(App.Placement(App.Vector(0,0,0), App.Rotation(90,0,0), App.Vector(0,0,0)))
 
 
 
 
-'''FEATURE GENERATION'''
-# generate circle features for tube
-def circle_feature(xdist, ros, diameter, ydist, arr_inc, arr_inst, length, material_type, o_0, o_90, o_180, o_270):
 
+'''FEATURE PLANNING'''
+# feature columns given in inches: XDistance, Diameter, Seperation, XDistance_Y, ArrayIncrement and ArrayIncrement_Y
+inch_columns = [1, 3, 4, 5, 6, 12]
+
+# orientation columns of each feature type in the order of faces 1 to 4, circles are cut 0, 270, 180, 90
+orientation_columns = {0: [8, 11, 10, 9], 1: [8, 9, 10, 11], 4: [8, 9, 10, 11]}
+
+# faces circles are cut on, with PieceMaker's orientations moved onto the faces that exist for the material type
+def circle_faces(faces, material_type):
 
 	#For flat bar, the only orientation that actually exists is the 270 one.  Therefore, o_0 becomes o_270 internally.
 	if material_type == 4:
-		o_270 = o_0
-		o_0 = 0
+		faces[:,3] = faces[:,0]
+		faces[:,0] = False
 
 	#For angle-iron, only the o_180 and o_270 orientations exist.  Therefore, o_0 becomes o_270 and o_90 becomes o_180 internally.
 	if material_type == 3:
-		o_270 = o_0
-		o_180 = o_90
-		#o_0 = 0
-		#o_90 = 0
+		faces[:,3] = faces[:,0]
+		faces[:,2] = faces[:,1]
 
 	#For C-Channel, the o_90 orientation does not exist.  Therefore, o_90 becomes o_270 internally.
 	if material_type == 5:
-		o_270 = o_90
-		o_90 = 0
+		faces[:,3] = faces[:,1]
+		faces[:,1] = False
+
+	return faces
+
+# expand every feature's X, Y and angular arrays on every face it is cut on into arrays with one entry per cut, in mm
+@timed
+def plan_features(feature_list, feat_length, material_type):
+
+	features = np.array(feature_list, dtype=np.float64).reshape(-1, len(feature_data_needed))
+	defined = np.flatnonzero(np.isin(features[:,0], list(orientation_columns)))  # undefined features are not cut
+	features = features[defined]
+	features[:,inch_columns] *= 25.4
+	desc_types = features[:,0].astype(int)
+
+	# faces 1 to 4 each feature is cut on
+	faces = np.zeros((len(features), 4), dtype=bool)
+	for desc_type, columns in orientation_columns.items():
+		faces[desc_types == desc_type] = features[desc_types == desc_type][:,columns].astype(int) != 0
+	faces[desc_types == 0] = circle_faces(faces[desc_types == 0], material_type)
+
+	# instances of each array, a feature without an angular array is cut once around the tube
+	instances_x = np.maximum(features[:,7].astype(int), 0)
+	instances_y = np.maximum(features[:,13].astype(int), 0)
+	instances_a = np.maximum(features[:,15].astype(int), 1)
+
+	# one cut for each X instance, Y row and angular step of a feature on each of its faces
+	feature_index, face_index = np.nonzero(faces)
+	cuts = (instances_x * instances_y * instances_a)[feature_index]
+	feature = np.repeat(feature_index, cuts)
+	face = np.repeat(face_index, cuts) + 1
+	instance = np.arange(cuts.sum()) - np.repeat(np.cumsum(cuts) - cuts, cuts)
+	step_x = instance % instances_x[feature]
+	row = instance // instances_x[feature] % instances_y[feature]
+	step_a = instance // (instances_x[feature] * instances_y[feature])
+
+	values = features[feature]
+	plan = {
+		'feature': defined[feature],  # index in feature_list
+		'type': desc_types[feature],
+		'face': face,
+		'row': row,
+		'x': -feat_length + values[:,1] + step_x * values[:,6],  # along the tube, from the second end
+		'y': np.where(desc_types[feature] == 0, values[:,5] + row * values[:,12], 0),  # across the face, rectangles and slots are centred
+		'angle': step_a * values[:,14],  # about the tube axis, in degrees
+		'step': step_a,
+		'step_x': step_x,
+		'x_increment': values[:,6],
+		'x_instances': instances_x[feature],
+		'angle_increment': values[:,14],
+		'angle_instances': instances_a[feature],
+		'diameter': values[:,3],
+		'sep': values[:,4],
+	}
+
+	# cuts in the order features are read, then by row, angle and face
+	order = np.lexsort((step_x, face, step_a, row, feature))
+
+	return {column: plan[column][order] for column in plan}
 
-	global sketch_counter
-	o_counter = 1 # represents which orientation the loop is on
 
-	for orientation in [o_0, o_90, o_180, o_270]:
+'''FEATURE GENERATION'''
+# merge every feature cut on the same face into one sketch and one pocket, instead of a sketch and pocket per feature
+merge_features = bool(os.environ.get('TUBEGEN_MERGE'))
+
+# sketch and pocket names of each feature type
+feature_names = {0: 'Circle', 1: 'Slot', 4: 'Rectangle'}
 
-		sc = str(sketch_counter)
+# sketch for feature cuts on a face, on the right plane for 0 and 180 and the top plane for 90 and 270
+def feature_sketch(name, face):
 
-		# only cut that side if it was selected
-		if orientation == True:
+	if face == 1 or face == 3:
+		return new_sketch(name, 'YZ_Plane')
 
-			# sketch creation, FreeCAD requires dynamically named executable statements because of its method structure
-			exec('App.activeDocument().Body.newObject("Sketcher::SketchObject","CircleFeatureSketch" + sc)')
+	return new_sketch(name, 'XY_Plane')
 
-			# right plane
-			if o_counter == 1 or o_counter == 3:
-				exec('App.activeDocument().CircleFeatureSketch' + sc + '.Support = (App.activeDocument().YZ_Plane, [''])')
+# angular array as (occurrences, degrees between them) reduced to one turn, None when every copy lands on the first
+def polar_array(instances, increment):
 
-			# top plane
-			elif o_counter == 2 or o_counter == 4:
-				exec('App.activeDocument().CircleFeatureSketch' + sc + '.Support = (App.activeDocument().XY_Plane, [''])')
+	step = abs(increment) % 360
 
-			exec('App.activeDocument().CircleFeatureSketch' + sc + '.MapMode = "FlatFace"')
-			App.ActiveDocument.recompute()
+	# copies that come back round onto earlier ones leave an even ring of the first few
+	for occurrences in range(1, instances):
+		turns = occurrences * step / 360
+		if abs(turns - round(turns)) * 360 < 1e-6:
+			if occurrences == 1:
+				return None
+			return (occurrences, math.copysign(360 / occurrences, increment))
 
-			# calculations
-			x_feat_location = -length + xdist
-			radius = diameter / 2
+	return (instances, math.copysign(step, increment)) if instances > 1 else None
 
-			# iterate over array of feature type
-			for instance in range(arr_inst):
+# extrude cut a feature sketch, reversed for 0 and 90, 180 and 270 cut the other side, repeated along the tube and about it for arrays
+def feature_pocket(name, sketch, face, pocket_type, x_instances=1, x_increment=0, angle_instances=1, angle_increment=0):
 
-				# sketch circle
-				if o_counter == 1 or o_counter == 3:
-					exec('App.ActiveDocument.CircleFeatureSketch' + sc + '.addGeometry(Part.Circle(App.Vector(' + str(x_feat_location + instance * arr_inc) + ',ydist,0),App.Vector(0,0,1),radius),False)')
+	linear = (x_instances, x_increment) if x_instances > 1 and x_increment != 0 else None
+	polar = polar_array(angle_instances, angle_increment)
 
-				elif o_counter == 2 or o_counter == 4:
-					exec('App.ActiveDocument.CircleFeatureSketch' + sc + '.addGeometry(Part.Circle(App.Vector(ydist,' + str(x_feat_location + instance * arr_inc) + ',0),App.Vector(0,0,1),radius),False)')
+	pocket(name, sketch, 1000, 1000, pocket_type, face == 1 or face == 2, linear, polar)  # 1 is 'Through All', 4 'Two Dimensions'
 
-			# extrude cut feature
-			exec('App.activeDocument().Body.newObject("PartDesign::Pocket","CircleFeaturePocket" + sc)')
-			exec('App.activeDocument().CircleFeaturePocket' + sc + '.Profile = App.activeDocument().CircleFeatureSketch' + sc)
-			exec('App.activeDocument().CircleFeaturePocket' + sc + '.Length = 5.0')
-			App.ActiveDocument.recompute()
+# sketch circles centred x along the tube and y across the face
+@timed
+def circle_geometry(sketch, x, y, diameter, sep, face):
 
-			exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Length = 1000.00000')
-			exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Length2 = 1000.0000')
+	u, v = (x, y) if face == 1 or face == 3 else (y, x)
 
-			if material_type == 3:  # angle iron
-				#exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Type = 4')  # 'Two Dimensions'
-				exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Type = 1')  # 'Through All'
-			else:
-				exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Type = 1')  # 'Through All'
+	sketch.addGeometry([Part.Circle(App.Vector(center_u,center_v,0),App.Vector(0,0,1),radius) for center_u, center_v, radius in zip(u.tolist(), v.tolist(), (diameter / 2).tolist())],False)
 
-			exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.UpToFace = None')
+# sketch rectangles diameter long along the tube and sep wide across the face
+@timed
+def rectangle_geometry(sketch, x, y, diameter, sep, face):
 
-			# 0 and 90
-			if o_counter == 1 or o_counter == 2:
-				exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Reversed = 1')
+	# calculate positions of corners for rectangles
+	if face == 1 or face == 3:
+		corners = (x - diameter / 2, x + diameter / 2, y - sep / 2, y + sep / 2)
+	else:
+		corners = (y - sep / 2, y + sep / 2, x - diameter / 2, x + diameter / 2)
 
-			# reverse side of cut for 180 and 270
-			elif o_counter == 3 or o_counter == 4:
-				exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Reversed = 0')
+	first = len(sketch.Geometry)
+	geoList = []
+	conList = []
+	for instance, (rect_nx, rect_x, rect_ny, rect_y) in enumerate(zip(*[corner.tolist() for corner in corners])):
+		geoList.append(Part.LineSegment(App.Vector(rect_nx,rect_ny,0),App.Vector(rect_x,rect_ny,0)))  # bottom edge
+		geoList.append(Part.LineSegment(App.Vector(rect_x,rect_ny,0),App.Vector(rect_x,rect_y,0)))  # right edge
+		geoList.append(Part.LineSegment(App.Vector(rect_x,rect_y,0),App.Vector(rect_nx,rect_y,0)))  # top edge
+		geoList.append(Part.LineSegment(App.Vector(rect_nx,rect_y,0),App.Vector(rect_nx,rect_ny,0)))  # left edge
+
+		edge = first + 4 * instance
+		conList.append(Sketcher.Constraint('Coincident',edge + 0,2,edge + 1,1))
+		conList.append(Sketcher.Constraint('Coincident',edge + 1,2,edge + 2,1))
+		conList.append(Sketcher.Constraint('Coincident',edge + 2,2,edge + 3,1))
+		conList.append(Sketcher.Constraint('Coincident',edge + 3,2,edge + 0,1))
+		conList.append(Sketcher.Constraint('Horizontal',edge + 0))
+		conList.append(Sketcher.Constraint('Horizontal',edge + 2))
+		conList.append(Sketcher.Constraint('Vertical',edge + 1))
+		conList.append(Sketcher.Constraint('Vertical',edge + 3))
+
+	sketch.addGeometry(geoList,False)
+	sketch.addConstraint(conList)
+
+# sketch slots with sep between their end centres along the tube and diameter wide
+@timed
+def slot_geometry(sketch, x, y, diameter, sep, face):
+
+	first = len(sketch.Geometry)
+	geoList = []
+	conList = []
+	for instance, (center, across, radius, half_sep) in enumerate(zip(x.tolist(), y.tolist(), (diameter / 2).tolist(), (sep / 2).tolist())):
+		slot_n = center - half_sep
+		slot = center + half_sep
+		edge = first + 4 * instance
+
+		if face == 1 or face == 3:
+			geoList.append(Part.ArcOfCircle(Part.Circle(App.Vector(slot_n,across,0),App.Vector(0,0,1),radius),math.pi/2,-math.pi/2)) # left semicircle
+			geoList.append(Part.ArcOfCircle(Part.Circle(App.Vector(slot,across,0),App.Vector(0,0,1),radius),-math.pi/2,math.pi/2)) # right semicircle
+			geoList.append(Part.LineSegment(App.Vector(slot_n,across - radius,0),App.Vector(slot,across - radius,0))) # bottom line segment
+			geoList.append(Part.LineSegment(App.Vector(slot_n,across + radius,0),App.Vector(slot,across + radius,0))) # top line segment
+			conList.append(Sketcher.Constraint('Horizontal',edge + 2))
+		else:
+			geoList.append(Part.ArcOfCircle(Part.Circle(App.Vector(across,slot_n,0),App.Vector(0,0,1),radius),math.pi,0))
+			geoList.append(Part.ArcOfCircle(Part.Circle(App.Vector(across,slot,0),App.Vector(0,0,1),radius),0,math.pi))
+			geoList.append(Part.LineSegment(App.Vector(across + radius,slot_n,0),App.Vector(across + radius,slot,0)))
+			geoList.append(Part.LineSegment(App.Vector(across - radius,slot_n,0),App.Vector(across - radius,slot,0)))
+			conList.append(Sketcher.Constraint('Vertical',edge + 2))
+
+		conList.append(Sketcher.Constraint('Tangent',edge + 0,1,edge + 3,1))
+		conList.append(Sketcher.Constraint('Tangent',edge + 0,2,edge + 2,1))
+		conList.append(Sketcher.Constraint('Tangent',edge + 2,2,edge + 1,1))
+		conList.append(Sketcher.Constraint('Tangent',edge + 3,2,edge + 1,2))
+		conList.append(Sketcher.Constraint('Equal',edge + 0,edge + 1))
+
+	sketch.addGeometry(geoList,False)
+	sketch.addConstraint(conList)
+
+# planned cuts sketched together, one group per feature, row and face, or per face, pocket type and array when merged
+def feature_groups(plan, pocket_types):
+
+	# arrays are sketched as their first cut, a seed whose pocket is repeated along the tube and about it
+	base = np.flatnonzero((plan['step'] == 0) & (plan['step_x'] == 0))
+	pattern = np.column_stack((plan['x_instances'], plan['x_increment'], plan['angle_instances'], plan['angle_increment']))
+
+	if merge_features:
+		# identical profiles would lie on top of each other in the face's sketch, e.g. rows of rectangles and slots, which are centred across the face
+		profiles = np.column_stack((plan['face'], pocket_types, pattern, plan['type'], np.round(np.column_stack((plan['x'], plan['y'], plan['diameter'], plan['sep'])), 6)))
+		base = np.sort(base[np.unique(profiles[base], axis=0, return_index=True)[1]])
+
+		keys = np.column_stack((plan['face'], pocket_types, pattern))
+		order = base[np.lexsort(keys[base].T[::-1])]
+	else:
+		keys = np.column_stack((plan['feature'], plan['row'], plan['face']))
+		order = base
 
-			exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Midplane = 0')
-			exec('App.ActiveDocument.CircleFeaturePocket' + sc + '.Offset = 0.000000')
-			App.ActiveDocument.recompute()
+	if len(order) == 0:
+		return []
 
-			sketch_counter += 1
+	# cuts sharing a key share a sketch
+	keys = keys[order]
+	starts = np.flatnonzero(np.r_[True, np.any(keys[1:] != keys[:-1], axis=1)])
+	ends = np.r_[starts[1:], len(keys)]
 
-		o_counter += 1
+	return [order[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
 
-# generate rectangular features for tube
-def rectangle_feature(xdist, ros, diameter, sep, ydist, arr_inc, arr_inst, length, material_type, o_0, o_90, o_180, o_270):
+# sketch and pocket planned cuts, one sketch and pocket per group of cuts
+@timed
+def cut_features(plan, material_type):
 
 	global sketch_counter
-	o_counter = 1 # represents which orientation the loop is on
 
-	for orientation in [o_0, o_90, o_180, o_270]:
+	# angle iron cuts rectangles and slots to a depth, everything else cuts through all
+	pocket_types = np.where((material_type == 3) & (plan['type'] != 0), 4, 1)
 
+	for cuts in feature_groups(plan, pocket_types):
+		first = cuts[0]
 		sc = str(sketch_counter)
 
-		# only cut that side if it was selected
-		if orientation == True:
-
-			# sketch creation, FreeCAD requires dynamically named executable statements because of its method structure
-			exec('App.activeDocument().Body.newObject("Sketcher::SketchObject","RectangleFeatureSketch" + sc)')
-
-			# right plane
-			if o_counter == 1 or o_counter == 3:
-				exec('App.activeDocument().RectangleFeatureSketch' + sc + '.Support = (App.activeDocument().YZ_Plane, [''])')
-
-			# top plane
-			elif o_counter == 2 or o_counter == 4:
-				exec('App.activeDocument().RectangleFeatureSketch' + sc + '.Support = (App.activeDocument().XY_Plane, [''])')
-
-			exec('App.activeDocument().RectangleFeatureSketch' + sc + '.MapMode = "FlatFace"')
-			App.ActiveDocument.recompute()
-
-			# calculations
-			x_feat_location = -length + xdist
-
-			# calculate positions of corners for rectangle
-			rect_x = 0.5 * sep  # positive x coordinate
-			rect_y = 0.5 * sep
-			rect_nx = -0.5 * sep  # negative x coordinate
-			rect_ny = -0.5 * sep
-
-			# iterate over array of feature type
-			for instance in range(arr_inst):
-
-				# sketch rectangle (right plane)
-				if o_counter == 1 or o_counter == 3:
-
-					# recalculate corner coordinates based on array instance
-					rect_x = x_feat_location + (diameter/2) + instance * arr_inc
-					rect_nx = x_feat_location - (diameter/2) + instance * arr_inc
-
-					# sketch rectangle
-					geoList = []
-					geoList.append(Part.LineSegment(App.Vector(rect_nx,rect_ny,0),App.Vector(rect_x,rect_ny,0)))  # bottom edge
-					geoList.append(Part.LineSegment(App.Vector(rect_x,rect_ny,0),App.Vector(rect_x,rect_y,0)))  # right edge
-					geoList.append(Part.LineSegment(App.Vector(rect_x,rect_y,0),App.Vector(rect_nx,rect_y,0)))  # top edge
-					geoList.append(Part.LineSegment(App.Vector(rect_nx,rect_y,0),App.Vector(rect_nx,rect_ny,0)))  # left edge
-					exec('App.ActiveDocument.RectangleFeatureSketch' + sc + '.addGeometry(geoList,False)')
-
-					conList = []
-					conList.append(Sketcher.Constraint('Coincident',0 + (4 * instance),2,1 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Coincident',1 + (4 * instance),2,2 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Coincident',2 + (4 * instance),2,3 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Coincident',3 + (4 * instance),2,0 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Horizontal',0 + (4 * instance)))
-					conList.append(Sketcher.Constraint('Horizontal',2 + (4 * instance)))
-					conList.append(Sketcher.Constraint('Vertical',1 + (4 * instance)))
-					conList.append(Sketcher.Constraint('Vertical',3 + (4 * instance)))
-					exec('App.ActiveDocument.RectangleFeatureSketch' + sc + '.addConstraint(conList)')
-					App.ActiveDocument.recompute()
-
-				# sketch rectangle (top plane)
-				elif o_counter == 2 or o_counter == 4:
-
-					# move coordinates based on feature location
-					rect_y = x_feat_location + (diameter/2) + instance * arr_inc
-					rect_ny = x_feat_location - (diameter/2) + instance * arr_inc
-
-					# sketch rectangle
-					geoList = []
-					geoList.append(Part.LineSegment(App.Vector(rect_nx,rect_ny,0),App.Vector(rect_x,rect_ny,0)))  # bottom edge
-					geoList.append(Part.LineSegment(App.Vector(rect_x,rect_ny,0),App.Vector(rect_x,rect_y,0)))  # right edge
-					geoList.append(Part.LineSegment(App.Vector(rect_x,rect_y,0),App.Vector(rect_nx,rect_y,0)))  # top edge
-					geoList.append(Part.LineSegment(App.Vector(rect_nx,rect_y,0),App.Vector(rect_nx,rect_ny,0)))  # left edge
-					exec('App.ActiveDocument.RectangleFeatureSketch' + sc + '.addGeometry(geoList,False)')
-
-					conList = []
-					conList.append(Sketcher.Constraint('Coincident',0 + (4 * instance),2,1 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Coincident',1 + (4 * instance),2,2 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Coincident',2 + (4 * instance),2,3 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Coincident',3 + (4 * instance),2,0 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Horizontal',0 + (4 * instance)))
-					conList.append(Sketcher.Constraint('Horizontal',2 + (4 * instance)))
-					conList.append(Sketcher.Constraint('Vertical',1 + (4 * instance)))
-					conList.append(Sketcher.Constraint('Vertical',3 + (4 * instance)))
-					exec('App.ActiveDocument.RectangleFeatureSketch' + sc + '.addConstraint(conList)')
-					App.ActiveDocument.recompute()
-
-			# extrude cut feature
-			exec('App.activeDocument().Body.newObject("PartDesign::Pocket","RectangleFeaturePocket" + sc)')
-			exec('App.activeDocument().RectangleFeaturePocket' + sc + '.Profile = App.activeDocument().RectangleFeatureSketch' + sc)
-			exec('App.activeDocument().RectangleFeaturePocket' + sc + '.Length = 5.0')
-			App.ActiveDocument.recompute()
-
-			exec('App.ActiveDocument.RectangleFeaturePocket' + sc + '.Length = 1000.00000')
-			exec('App.ActiveDocument.RectangleFeaturePocket' + sc + '.Length2 = 1000.0000')
-
-			if material_type == 3:  # angle iron
-				exec('App.ActiveDocument.RectangleFeaturePocket' + sc + '.Type = 4')  # 'Two Dimensions'
-			else:
-				exec('App.ActiveDocument.RectangleFeaturePocket' + sc + '.Type = 1')  # 'Through All'
-
-			exec('App.ActiveDocument.RectangleFeaturePocket' + sc + '.UpToFace = None')
-
-			# 0 and 90
-			if o_counter == 1 or o_counter == 2:
-				exec('App.ActiveDocument.RectangleFeaturePocket' + sc + '.Reversed = 1')
-
-			# reverse side of cut for 180 and 270
-			elif o_counter == 3 or o_counter == 4:
-				exec('App.ActiveDocument.RectangleFeaturePocket' + sc + '.Reversed = 0')
-
-			exec('App.ActiveDocument.RectangleFeaturePocket' + sc + '.Midplane = 0')
-			exec('App.ActiveDocument.RectangleFeaturePocket' + sc + '.Offset = 0.000000')
-			App.ActiveDocument.recompute()
-
-			sketch_counter += 1
-
-		o_counter += 1
-
-# generate slot features for tube
-def slot_feature(xdist, ros, diameter, sep, ydist, arr_inc, arr_inst, length, material_type, o_0,o_90, o_180, o_270):
-
-	global sketch_counter
-	o_counter = 1 # represents which orientation the loop is on
+		face = int(plan['face'][first])
+		name = 'Face' if merge_features else feature_names[int(plan['type'][first])]
+
+		sketch = feature_sketch(name + 'FeatureSketch' + sc, face)
+
+		for desc_type, geometry in ((0, circle_geometry), (1, slot_geometry), (4, rectangle_geometry)):
+			typed = cuts[plan['type'][cuts] == desc_type]
+			if len(typed):
+				geometry(sketch, plan['x'][typed], plan['y'][typed], plan['diameter'][typed], plan['sep'][typed], face)
+
+		feature_pocket(name + 'FeaturePocket' + sc, sketch, face, int(pocket_types[first]), int(plan['x_instances'][first]), float(plan['x_increment'][first]), int(plan['angle_instances'][first]), float(plan['angle_increment'][first]))
+		recompute()
+
+		sketch_counter += 1
+
+
+# run the server, a batch job if TUBEGEN_JOB names a job folder or manifest, or the single PieceMaker piece
+def main():
+
+	job = os.environ.get('TUBEGEN_JOB')
+	workers = os.environ.get('TUBEGEN_WORKERS')
+	timeout = os.environ.get('TUBEGEN_TIMEOUT')
+
+	if os.environ.get('TUBEGEN_WORKER'):  # started by parallel_generate
+		worker_loop()
+	elif os.environ.get('TUBEGEN_COMPARE'):
+		compare_engines(os.environ['TUBEGEN_COMPARE'])
+	elif os.environ.get('TUBEGEN_COMPARE_RECOMPUTE'):
+		compare_recompute(os.environ['TUBEGEN_COMPARE_RECOMPUTE'])
+	elif os.environ.get('TUBEGEN_COMPARE_CUT'):
+		compare_cut(os.environ['TUBEGEN_COMPARE_CUT'])
+	elif os.environ.get('TUBEGEN_BUILD_CATALOG'):
+		build_catalog()
+	elif os.environ.get('TUBEGEN_SERVE'):
+		serve(int(os.environ['TUBEGEN_SERVE']))
+	elif job and workers and not is_cut_list(job):  # cut lists are streamed by one process
+		parallel_generate(job, os.environ.get('TUBEGEN_OUT'), int(workers), float(timeout) if timeout else None)
+	elif job:
+		batch_generate(job, os.environ.get('TUBEGEN_OUT'))
+	elif os.environ.get('TUBEGEN_CSV'):  # one piece, headless
+		generate_piece(os.environ['TUBEGEN_CSV'], os.environ.get('TUBEGEN_STL', os.path.splitext(os.environ['TUBEGEN_CSV'])[0] + '.stl'))
+	else:
+		set_paths()
 
-	for orientation in [o_0, o_90, o_180, o_270]:
+# whether FreeCAD was started with this file, which it imports as a module named tubegen rather than running as __main__
+def launched_by_freecad():
 
-		sc = str(sketch_counter)
+	if 'FreeCAD' not in sys.modules:  # plain Python, e.g. an import from the tests
+		return False
 
-		# only cut that side if it was selected
-		if orientation == True:
-
-			# sketch creation, FreeCAD requires dynamically named executable statements because of its method structure
-			exec('App.activeDocument().Body.newObject("Sketcher::SketchObject","SlotFeatureSketch" + sc)')
-
-			# right plane
-			if o_counter == 1 or o_counter == 3:
-				exec('App.activeDocument().SlotFeatureSketch' + sc + '.Support = (App.activeDocument().YZ_Plane, [''])')
+	# a script that imports tubegen under FreeCAD, like the soak test, is the one named on the command line instead
+	script = os.path.realpath(__file__)
+	return any(os.path.realpath(argument) == script for argument in getattr(sys, 'argv', [])[1:] if argument.endswith('.py'))
 
-			# top plane
-			elif o_counter == 2 or o_counter == 4:
-				exec('App.activeDocument().SlotFeatureSketch' + sc + '.Support = (App.activeDocument().XY_Plane, [''])')
-
-			exec('App.activeDocument().SlotFeatureSketch' + sc + '.MapMode = "FlatFace"')
-			App.ActiveDocument.recompute()
-
-			# calculations
-			x_feat_location = -length + xdist
-			radius = diameter / 2
-
-			# calculate positions of corners for square face
-			slot_x = 0.5 * diameter # outer positive x coordinate
-			slot_y = 0.5 * diameter
-			slot_nx = -0.5 * diameter # outer negative x coordinate
-			slot_ny = -0.5 * diameter
-
-			# iterate over array of feature type
-			for instance in range(arr_inst):
-
-				# sketch feature
-				if o_counter == 1 or o_counter == 3:
-
-					# move coordinates based on feature location
-					slot_x = x_feat_location + (sep/2) + (arr_inc * instance)
-					slot_nx = x_feat_location - (sep/2) + (arr_inc * instance)
-
-					# sketch slot
-					geoList = []
-					geoList.append(Part.ArcOfCircle(Part.Circle(App.Vector(slot_nx,0,0),App.Vector(0,0,1),radius),math.pi/2,-math.pi/2)) # left semicircle
-					geoList.append(Part.ArcOfCircle(Part.Circle(App.Vector(slot_x,0,0),App.Vector(0,0,1),radius),-math.pi/2,math.pi/2)) # right semicircle
-					geoList.append(Part.LineSegment(App.Vector(slot_nx,-radius,0),App.Vector(slot_x,-radius,0))) # bottom line segment
-					geoList.append(Part.LineSegment(App.Vector(slot_nx,radius,0),App.Vector(slot_x,radius,0))) # top line segment
-					exec('App.ActiveDocument.SlotFeatureSketch' + sc + '.addGeometry(geoList,False)')
-
-					conList = []
-					conList.append(Sketcher.Constraint('Tangent',0 + (4 * instance),1,3 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Tangent',0 + (4 * instance),2,2 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Tangent',2 + (4 * instance),2,1 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Tangent',3 + (4 * instance),2,1 + (4 * instance),2))
-					conList.append(Sketcher.Constraint('Horizontal',2 + (4 * instance)))
-					conList.append(Sketcher.Constraint('Equal',0 + (4 * instance),1 + (4 * instance)))
-					exec('App.ActiveDocument.SlotFeatureSketch' + sc + '.addConstraint(conList)')
-
-				elif o_counter == 2 or o_counter == 4:
-
-					# move coordinates based on feature location
-					slot_y = x_feat_location + (sep/2) + (arr_inc * instance)
-					slot_ny = x_feat_location - (sep/2) + (arr_inc * instance)
-
-					geoList = []
-					geoList.append(Part.ArcOfCircle(Part.Circle(App.Vector(0,slot_ny,0),App.Vector(0,0,1),radius),math.pi,0))
-					geoList.append(Part.ArcOfCircle(Part.Circle(App.Vector(0,slot_y,0),App.Vector(0,0,1),radius),0,math.pi))
-					geoList.append(Part.LineSegment(App.Vector(radius,slot_ny,0),App.Vector(radius,slot_y,0)))
-					geoList.append(Part.LineSegment(App.Vector(-radius,slot_ny,0),App.Vector(-radius,slot_y,0)))
-					exec('App.ActiveDocument.SlotFeatureSketch' + sc + '.addGeometry(geoList,False)')
-
-					conList = []
-					conList.append(Sketcher.Constraint('Tangent',0 + (4 * instance),1,3 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Tangent',0 + (4 * instance),2,2 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Tangent',2 + (4 * instance),2,1 + (4 * instance),1))
-					conList.append(Sketcher.Constraint('Tangent',3 + (4 * instance),2,1 + (4 * instance),2))
-					conList.append(Sketcher.Constraint('Vertical',2 + (4 * instance)))
-					conList.append(Sketcher.Constraint('Equal',0 + (4 * instance),1 + (4 * instance)))
-					exec('App.ActiveDocument.SlotFeatureSketch' + sc + '.addConstraint(conList)')
-
-			# extrude cut feature
-			exec('App.activeDocument().Body.newObject("PartDesign::Pocket","SlotFeaturePocket" + sc)')
-			exec('App.activeDocument().SlotFeaturePocket' + sc + '.Profile = App.activeDocument().SlotFeatureSketch' + sc)
-			exec('App.activeDocument().SlotFeaturePocket' + sc + '.Length = 5.0')
-			App.ActiveDocument.recompute()
-
-			exec('App.ActiveDocument.SlotFeaturePocket' + sc + '.Length = 1000.00000')
-			exec('App.ActiveDocument.SlotFeaturePocket' + sc + '.Length2 = 1000.0000')
-
-			if material_type == 3:  # angle iron
-				exec('App.ActiveDocument.SlotFeaturePocket' + sc + '.Type = 4')  # 'Two Dimensions'
-			else:
-				exec('App.ActiveDocument.SlotFeaturePocket' + sc + '.Type = 1')  # 'Through All'
-
-			exec('App.ActiveDocument.SlotFeaturePocket' + sc + '.UpToFace = None')
-
-			# 0 and 90
-			if o_counter == 1 or o_counter == 2:
-				exec('App.ActiveDocument.SlotFeaturePocket' + sc + '.Reversed = 1')
-
-			# reverse side of cut for 180 and 270
-			if o_counter == 3 or o_counter == 4:
-				exec('App.ActiveDocument.SlotFeaturePocket' + sc + '.Reversed = 0')
-
-			exec('App.ActiveDocument.SlotFeaturePocket' + sc + '.Midplane = 0')
-			exec('App.ActiveDocument.SlotFeaturePocket' + sc + '.Offset = 0.000000')
-			App.ActiveDocument.recompute()
-
-			sketch_counter += 1
-
-		o_counter += 1
-
-
-# run total tube generation
-set_paths()
\ No newline at end of file
+# run total tube generation, as a script or when FreeCAD loads this file from its command line
+if __name__ == '__main__' or launched_by_freecad():
+	main()